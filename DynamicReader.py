@@ -1,19 +1,37 @@
 import pandas as pd
 import time
 import json
-import subprocess
 from urllib.parse import urlparse
 import asyncio
+import argparse
 import aiohttp
 from collections import defaultdict
-import re
-import requests
-from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import hashlib
+import threading
+from functools import partial
+from bodyMemo import BodyMemo, body_key
+from dnsResolver import DNSCache, make_aiohttp_resolver
+from httpCache import ResponseCache, cache_path
+from jsResolver import JS_KEEP_CHARS, first_party_script_urls, static_gtm_ids
+from rateLimiter import HostRateLimiter, RETRY_STATUSES, request_with_retry
+from runJournal import RunJournal
+from runStats import RunStats
+from scanPipeline import run_pipeline
+from scanPriority import PriorityScheduler
+from shardRunner import run_sharded
+from sheetIO import CSV_CHUNK_SIZE, read_sheet_chunks, split_cell, text_column, write_sheet
+from subfinderCache import SubfinderRunner, enumerate_subdomains
+from workIndex import WorkIndex
+from workItem import RowResult, WorkItem, merge_subdomains
+from tagDetector import (
+    ScanTotals, detect_gtm_ids, gtm_ids, gtm_ids_from_urls, scan_response
+)
 
 # --- Selenium imports for dynamic fallback ---
 from selenium import webdriver
 from selenium.webdriver.chrome.options import Options
-from selenium.common.exceptions import TimeoutException, WebDriverException
+from selenium.common.exceptions import WebDriverException
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
@@ -23,26 +41,63 @@ from selenium.webdriver.support import expected_conditions as EC
 # -------------------------------------------------------------------
 # FALLBACK #2: Pure-HTML regex parse of <script> & <noscript> tags
 # -------------------------------------------------------------------
-def fetch_gtm_ids_from_html(url):
+HTML_FALLBACK_TIMEOUT = 10    # seconds for the fallback's own GET
+
+async def fetch_gtm_ids_from_html(session, url):
     """
-    Synchronous fallback to grab GTM IDs directly from raw page HTML.
+    Grab GTM IDs directly from raw page HTML, for pages whose primary GET
+    failed. The page is fetched again through the shared session, so the
+    event loop and every other domain keep going meanwhile.
     """
     try:
-        r = requests.get(url, headers={'User-Agent': 'Mozilla/5.0'}, timeout=10)
-        html = r.text
-        ids = set(re.findall(r'gtm\\.js\\?id=(GTM-[A-Z0-9\\-]{4,})', html, re.IGNORECASE))
-        ids |= set(re.findall(r'ns\\.html\\?id=(GTM-[A-Z0-9\\-]{4,})', html, re.IGNORECASE))
-        return list(ids)
+        with RUN_STATS.timed('html_fallback'):
+            async with await request_with_retry(
+                session, 'GET', url, RATE_LIMITER,
+                allow_redirects=True, timeout=HTML_FALLBACK_TIMEOUT
+            ) as resp:
+                tags, stats = await scan_response(resp)
+        RUN_STATS.add_bytes('html_fallback', stats['bytes_read'])
+        return gtm_ids(tags)
     except Exception:
         return []
 
 # -------------------------------------------------------------------
-# FALLBACK: Selenium-based GTM extractor for dynamically-injected snippets
+# Selenium driver pool: long-lived headless Chrome reused across URLs
 # -------------------------------------------------------------------
-def extract_gtm_id_selenium(url):
+# Number of Chrome drivers kept alive (also caps concurrent Selenium fallbacks)
+SEL_POOL_SIZE = 3
+# Recycle a driver after this many page checks to keep memory in check
+SEL_MAX_USES = 50
+
+# Lean render profile: only gtm.js matters, so skip images, fonts, media,
+# stylesheets and other ad/analytics tags, and render into a small window
+SEL_LEAN_PROFILE = True
+SEL_LEAN_WINDOW_SIZE = "800,600"
+SEL_BLOCKED_EXTENSIONS = (
+    'png', 'jpg', 'jpeg', 'gif', 'webp', 'avif', 'svg', 'ico', 'bmp',   # images
+    'woff', 'woff2', 'ttf', 'otf', 'eot',                               # fonts
+    'mp4', 'webm', 'ogg', 'mp3', 'wav', 'm4a', 'mov',                   # media
+    'css',                                                              # stylesheets
+)
+# Never list googletagmanager.com here
+SEL_BLOCKED_HOSTS = (
+    'doubleclick.net', 'googlesyndication.com', 'googleadservices.com',
+    'google-analytics.com', 'connect.facebook.net', 'static.hotjar.com',
+    'clarity.ms', 'adnxs.com', 'criteo.com', 'criteo.net', 'taboola.com',
+    'outbrain.com', 'scorecardresearch.com', 'bat.bing.com', 'snap.licdn.com',
+)
+# URL patterns for CDP Network.setBlockedURLs ('*' is the only wildcard)
+SEL_BLOCKED_URLS = (
+    [f"*.{ext}" for ext in SEL_BLOCKED_EXTENSIONS]
+    + [f"*.{ext}?*" for ext in SEL_BLOCKED_EXTENSIONS]
+    + [f"*{host}/*" for host in SEL_BLOCKED_HOSTS]
+)
+
+def new_chrome_driver(lean=SEL_LEAN_PROFILE):
     """
-    Spin up headless Chrome, enable CDP network logs, wait for scripts,
-    and extract GTM IDs from performance logs and final page_source.
+    Start a headless Chrome with CDP performance logging enabled. The lean
+    profile turns images off (so none are fetched, decoded or cached) and
+    blocks SEL_BLOCKED_URLS for the life of the driver.
     """
     chrome_options = Options()
     # “new” headless often performs more like real Chrome
@@ -50,60 +105,206 @@ def extract_gtm_id_selenium(url):
     chrome_options.add_argument("--disable-gpu")
     chrome_options.add_argument("--no-sandbox")
     chrome_options.add_argument("--disable-extensions")
-    chrome_options.add_argument("--window-size=1920,1080")
+    if lean:
+        chrome_options.add_argument(f"--window-size={SEL_LEAN_WINDOW_SIZE}")
+        chrome_options.add_argument("--blink-settings=imagesEnabled=false")
+        chrome_options.add_argument("--mute-audio")
+        chrome_options.add_experimental_option(
+            "prefs", {"profile.managed_default_content_settings.images": 2}
+        )
+    else:
+        chrome_options.add_argument("--window-size=1920,1080")
     chrome_options.set_capability("pageLoadStrategy", "eager")
     chrome_options.set_capability("goog:loggingPrefs", {"performance": "ALL"})
 
     driver = webdriver.Chrome(options=chrome_options)
     driver.set_page_load_timeout(60)
+    if lean:
+        driver.execute_cdp_cmd("Network.enable", {})
+        driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": SEL_BLOCKED_URLS})
+    return driver
+
+class ChromeDriverPool:
+    """
+    Thread-safe pool of headless Chrome drivers. Drivers are checked out per
+    URL, reset to a blank page between uses, and recycled after `max_uses`
+    checks or whenever a check crashes.
+    """
+
+    def __init__(self, size=SEL_POOL_SIZE, max_uses=SEL_MAX_USES, lean=SEL_LEAN_PROFILE):
+        self.size = size
+        self.max_uses = max_uses
+        self.lean = lean
+        self._slots = threading.BoundedSemaphore(size)
+        self._lock = threading.Lock()
+        self._idle = []
+        self._uses = {}
+
+    def acquire(self):
+        """Check out a healthy driver, starting a new one if none is idle."""
+        self._slots.acquire()
+        try:
+            while True:
+                with self._lock:
+                    driver = self._idle.pop() if self._idle else None
+                if driver is None:
+                    driver = new_chrome_driver(self.lean)
+                    self._uses[id(driver)] = 0
+                    return driver
+                if self._is_healthy(driver):
+                    return driver
+                self._discard(driver)
+        except Exception:
+            self._slots.release()
+            raise
+
+    def release(self, driver, healthy=True):
+        """Return a driver to the pool, or quit it if it is worn out or broken."""
+        try:
+            uses = self._uses.get(id(driver), 0) + 1
+            self._uses[id(driver)] = uses
+            if healthy and uses < self.max_uses and self._reset(driver):
+                with self._lock:
+                    self._idle.append(driver)
+            else:
+                self._discard(driver)
+        finally:
+            self._slots.release()
+
+    def close(self):
+        """Quit every idle driver."""
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for driver in idle:
+            self._discard(driver)
+
+    def _is_healthy(self, driver):
+        try:
+            driver.execute_script("return 1")
+            return True
+        except Exception:
+            return False
+
+    def _reset(self, driver):
+        """Close extra tabs, blank the page, and clear cookies and pending logs."""
+        try:
+            handles = driver.window_handles
+            for handle in handles[1:]:
+                driver.switch_to.window(handle)
+                driver.close()
+            driver.switch_to.window(handles[0])
+            driver.get("about:blank")
+            driver.delete_all_cookies()
+            driver.execute_cdp_cmd("Network.clearBrowserCookies", {})
+            driver.get_log("performance")
+            return True
+        except Exception:
+            return False
+
+    def _discard(self, driver):
+        self._uses.pop(id(driver), None)
+        try:
+            driver.quit()
+        except Exception:
+            pass
+
+SELENIUM_POOL = ChromeDriverPool()
+
+# -------------------------------------------------------------------
+# FALLBACK: Selenium-based GTM extractor for dynamically-injected snippets
+# -------------------------------------------------------------------
+# Seconds to wait for GTM to show up before giving up on a page
+SEL_DETECT_TIMEOUT = 10
+# Seconds between drains of the CDP network event log (cheap: new events only)
+SEL_EVENT_POLL = 0.05
+# Seconds between in-page probes (one small execute_script, no DOM serialization)
+SEL_PROBE_EVERY = 0.5
+
+# GTM containers registered on the page, plus gtm.js requests from the
+# Resource Timing buffer (what a PerformanceObserver would report)
+GTM_PROBE_SCRIPT = """
+var found = Object.keys(window.google_tag_manager || {}).filter(function (k) {
+    return k.indexOf('GTM-') === 0;
+});
+(performance.getEntriesByType('resource') || []).forEach(function (e) {
+    if (e.name.indexOf('gtm.js') !== -1) { found.push(e.name); }
+});
+return found;
+"""
+
+def gtm_ids_from_network_events(driver):
+    """GTM IDs from gtm.js requests in the CDP events logged since the last call."""
+    urls = []
+    for entry in driver.get_log("performance"):
+        try:
+            msg = json.loads(entry["message"])["message"]
+        except (json.JSONDecodeError, KeyError):
+            continue
+        if msg.get("method") == "Network.requestWillBeSent":
+            urls.append(msg["params"]["request"].get("url", ""))
+    return gtm_ids_from_urls(urls)
+
+def gtm_ids_from_page_probe(driver):
+    """GTM IDs from GTM_PROBE_SCRIPT; none while the page is still navigating."""
+    try:
+        return detect_gtm_ids(' '.join(driver.execute_script(GTM_PROBE_SCRIPT) or []))
+    except WebDriverException:
+        # e.g. the execution context was replaced mid-navigation
+        return []
+
+def extract_gtm_id_selenium(url, pool=None, timeout=None, raise_errors=False):
+    """
+    Check out a headless Chrome (or spawn a fresh one when no pool is given)
+    and return as soon as GTM is seen: a Network.requestWillBeSent for
+    gtm.js?id=, or a container in window.google_tag_manager. Navigation goes
+    through CDP so detection can start before DOMContentLoaded; the page
+    source is scanned once, only if nothing turned up by `timeout` seconds
+    (default SEL_DETECT_TIMEOUT). A crashed check returns [] unless
+    `raise_errors`, in which case the WebDriverException is re-raised.
+    """
+    with RUN_STATS.timed('selenium'):
+        return _extract_gtm_id_selenium(url, pool, timeout, raise_errors)
+
+def _extract_gtm_id_selenium(url, pool, timeout=None, raise_errors=False):
+    driver = pool.acquire() if pool is not None else new_chrome_driver()
 
     found_ids = set()
+    healthy = True
     try:
         # Enable Network DevTools protocol before navigating
         driver.execute_cdp_cmd("Network.enable", {})
-
-        try:
-            driver.get(url)
-        except TimeoutException:
-            print(f"[WARN] Page load timed out for {url}, continuing anyway")
-
-        # Wait up to 10 seconds for a GTM snippet to appear in the DOM
-        # This helps ensure the async snippet has time to load
-        max_wait = 10
-        start_time = time.time()
-        while time.time() - start_time < max_wait:
-            # collect any IDs from performance logs first
-            for entry in driver.get_log("performance"):
-                try:
-                    msg = json.loads(entry["message"])["message"]
-                except (json.JSONDecodeError, KeyError):
-                    continue
-                if msg.get("method") == "Network.requestWillBeSent":
-                    req_url = msg["params"]["request"].get("url", "")
-                    m = re.search(r"id=(GTM-[A-Z0-9\\-]{4,})", req_url)
-                    if m:
-                        found_ids.add(m.group(1))
-
-            # parse final page_source
-            page_source = driver.page_source or ""
-            for tag in re.findall(r'gtm\\.js\\?id=(GTM-[A-Z0-9\\-]{4,})', page_source, re.IGNORECASE):
-                found_ids.add(tag)
-            for tag in re.findall(r'ns\\.html\\?id=(GTM-[A-Z0-9\\-]{4,})', page_source, re.IGNORECASE):
-                found_ids.add(tag)
-
-            if found_ids:
-                break
-            time.sleep(1)
+        driver.execute_cdp_cmd("Page.navigate", {"url": url})
+
+        deadline = time.monotonic() + (SEL_DETECT_TIMEOUT if timeout is None else timeout)
+        next_probe = time.monotonic()
+        while not found_ids and time.monotonic() < deadline:
+            found_ids.update(gtm_ids_from_network_events(driver))
+            if not found_ids and time.monotonic() >= next_probe:
+                found_ids.update(gtm_ids_from_page_probe(driver))
+                next_probe = time.monotonic() + SEL_PROBE_EVERY
+            if not found_ids:
+                time.sleep(SEL_EVENT_POLL)
+
+        # Inline snippet that never fired: one last look at the final DOM
+        if not found_ids:
+            found_ids.update(detect_gtm_ids(driver.page_source))
 
     except WebDriverException as e:
+        healthy = False
+        RUN_STATS.error('selenium', e)
         print(f"[WARN] Selenium fallback failed for {url}: {e}")
+        if raise_errors:
+            raise
     finally:
-        driver.quit()
+        if pool is not None:
+            pool.release(driver, healthy)
+        else:
+            driver.quit()
 
     return list(found_ids)
 
-# limit concurrent Selenium sessions
-SEL_FALLBACK_SEMAPHORE = asyncio.Semaphore(3)
+# limit concurrent Selenium sessions to the number of pooled drivers
+SEL_FALLBACK_SEMAPHORE = asyncio.Semaphore(SELENIUM_POOL.size)
 
 def extract_main_domain(url):
     """Extract the main domain using manual parsing."""
@@ -116,258 +317,630 @@ def extract_main_domain(url):
     parts = netloc.split('.')
     return '.'.join(parts[-2:]).lower() if len(parts) >= 2 else netloc.lower()
 
-def get_filtered_subdomains(domain):
+def filter_subdomains(domain, raw):
     """
-    Run subfinder for a domain, then filter out unwanted subdomains.
+    Filter raw subfinder output for a domain, dropping unwanted subdomains.
     Returns a list of subdomain URLs with `https://` prefix.
     """
-    try:
-        result = subprocess.run(
-            ['subfinder', '-d', domain, '-silent'],
-            capture_output=True, text=True, timeout=120
-        )
-        if result.returncode != 0:
-            print(f"[WARN] Subfinder error for {domain}: {result.stderr}")
-            return []
-        raw = result.stdout.splitlines()
-        exclude = {
-            'www.', 'ns.', 'mail.', 'webdisk.', 'cpanel.',
-            'cpcalenders.', 'webmail.', 'cpcontacts.',
-            'rent.', 'rentnow.', 'ww2.', 'autodiscover.',
-            'email.', 'lp.', 'child.', 'cpcalendars',
-            'dev.', 'landing.'
-        }
-        out = []
-        for sub in raw:
-            host = urlparse(sub).netloc if sub.startswith('http') else sub.split('/')[0]
-            host = host.split(':')[0]
-            if host.endswith(domain) and not any(host.startswith(p) for p in exclude):
-                out.append(f"https://{host}")
-        return out
-    except Exception as e:
-        print(f"[WARN] Error processing subdomains for {domain}: {e}")
-        return []
+    exclude = {
+        'www.', 'ns.', 'mail.', 'webdisk.', 'cpanel.',
+        'cpcalenders.', 'webmail.', 'cpcontacts.',
+        'rent.', 'rentnow.', 'ww2.', 'autodiscover.',
+        'email.', 'lp.', 'child.', 'cpcalendars',
+        'dev.', 'landing.'
+    }
+    out = []
+    for sub in raw:
+        host = urlparse(sub).netloc if sub.startswith('http') else sub.split('/')[0]
+        host = host.split(':')[0]
+        if host.endswith(domain) and not any(host.startswith(p) for p in exclude):
+            out.append(f"https://{host}")
+    return out
+
+# Bytes read / peak buffer totals from the streaming scanner
+SCAN_STATS = ScanTotals()
+# Per-stage latency, bytes and errors, plus counters: rows finished and which
+# tier settled each fully fetched page ('pages', 'http', 'js', 'chrome')
+RUN_STATS = RunStats()
+# Tag IDs + validators from this reader's previous runs (opened on first use)
+RESPONSE_CACHE = ResponseCache(cache_path('dynamic'))
+# Shared answers for the DNS stage, aiohttp and the probes
+DNS_CACHE = DNSCache()
+# Per-host and per-IP request budget shared by probes, GETs and Selenium
+RATE_LIMITER = HostRateLimiter(addresses=lambda host: DNS_CACHE.cached(host))
+# Each canonical URL is probed and scanned once per run, whichever rows list it
+WORK_INDEX = WorkIndex()
+# Fallback verdicts per distinct page body (parked pages, shared landing pages)
+BODY_MEMO = BodyMemo()
+# Apex/www-first scanning under a per-row and run-wide time budget (--priority)
+PRIORITY_SCAN = False
+SCHEDULER = PriorityScheduler()
+
+def past_deadline():
+    """True once a priority run has used up its run-wide time budget."""
+    return PRIORITY_SCAN and SCHEDULER.run_expired()
+
+async def fallback_tiers(session, url, page_text):
+    """
+    Tiers 2-4 for a page the plain GET found nothing on: static JS
+    resolution, then Selenium, then the HTML regex (only if the GET
+    read no body). Returns a BODY_MEMO
+    entry: the IDs, whether Chrome ran, and whether it found any, plus
+    'healthy': False if Chrome crashed, so the result is not remembered.
+    """
+    # 2) Static JS resolution, no browser needed
+    ids = []
+    if page_text:
+        with RUN_STATS.timed('static_js'):
+            ids = await static_gtm_ids(session, url, page_text, RATE_LIMITER)
+    if ids:
+        RUN_STATS.count('js')
+        return {'ids': ids, 'rendered': False, 'rendered_found_more': False}
+
+    # 3) Selenium fallback
+    RUN_STATS.count('chrome')
+    print(f"[INFO] Selenium fallback for {url}")
+    healthy = True
+    async with SEL_FALLBACK_SEMAPHORE:
+        await RATE_LIMITER.acquire(urlparse(url).hostname or '')
+        loop = asyncio.get_running_loop()
+        try:
+            ids = await loop.run_in_executor(
+                None, partial(extract_gtm_id_selenium, url, SELENIUM_POOL, raise_errors=True)
+            ) or []
+        except WebDriverException:
+            healthy = False
+            ids = []
+    if ids:
+        return {'ids': ids, 'rendered': True, 'rendered_found_more': True}
+
+    # 4) HTML-regex fallback, only if the primary GET read no body: a body
+    # it did read was already scanned with the same patterns
+    ids = []
+    if not page_text:
+        print(f"[INFO] HTML-regex fallback for {url}")
+        RUN_STATS.count('html_regex')
+        ids = await fetch_gtm_ids_from_html(session, url)
+    return {'ids': ids, 'rendered': True, 'rendered_found_more': False, 'healthy': healthy}
 
 async def fetch_gtm_ids(session, url):
     """
     Fetch GTM IDs by HTTP GET first, then fallback:
-      1) Selenium
-      2) Pure-HTML regex
+      1) Static JS resolution (loader arguments, concatenation, first-party bundles)
+      2) Selenium
+      3) Pure-HTML regex
+    Results are cached on disk; a fresh entry, a 304, or an unchanged body
+    reuses the cached IDs and skips parsing and all fallbacks. A body that
+    matches one already resolved in this run (BODY_MEMO) reuses its IDs and
+    skips the fallbacks too, Chrome included. A 429/503 is
+    retried with backoff; if the host is still throttling, the fallbacks are
+    skipped too, since Chrome would only be throttled as well.
     """
     headers = {'User-Agent': 'Mozilla/5.0'}
     found = set()
+    cached = None
+    validators = {}
+    page_text = ''
 
     # 1) HTTP GET + regex on <script> & <noscript>
     try:
-        async with session.get(url, headers=headers, allow_redirects=True, timeout=20) as resp:
-            final = str(resp.url)
-            if 'gtm.js' in final and 'id=' in final:
-                m = re.search(r'id=(GTM-[A-Z0-9\\-]{4,})', final)
-                if m:
-                    found.add(m.group(1))
-            for h in resp.history:
-                u = str(h.url)
-                if 'gtm.js' in u and 'id=' in u:
-                    m = re.search(r'id=(GTM-[A-Z0-9\\-]{4,})', u)
-                    if m:
-                        found.add(m.group(1))
-            text = await resp.text()
-            for tag in re.findall(r'gtm\\.js\\?id=(GTM-[A-Z0-9\\-]{4,})', text, re.IGNORECASE):
-                found.add(tag)
-            for tag in re.findall(r'ns\\.html\\?id=(GTM-[A-Z0-9\\-]{4,})', text, re.IGNORECASE):
-                found.add(tag)
+        cached = RESPONSE_CACHE.lookup(url)
+        if cached and cached['fresh']:
+            return cached['ids']
+        headers.update(RESPONSE_CACHE.conditional_headers(cached))
+        with RUN_STATS.timed('get'):
+            async with await request_with_retry(
+                session, 'GET', url, RATE_LIMITER,
+                headers=headers, allow_redirects=True, timeout=20
+            ) as resp:
+                if resp.status in RETRY_STATUSES:
+                    RUN_STATS.count('throttled')
+                    print(f"[WARN] Still throttled ({resp.status}) for {url}; skipping fallbacks")
+                    return cached['ids'] if cached else []
+                if resp.status == 304 and cached:
+                    RESPONSE_CACHE.revalidated(url)
+                    return cached['ids']
+                redirects = [str(h.url) for h in resp.history] + [str(resp.url)]
+                found.update(gtm_ids_from_urls(redirects))
+                hasher = hashlib.sha256()
+                tags, scan_stats = await scan_response(resp, hasher=hasher, keep_text=JS_KEEP_CHARS)
+        SCAN_STATS.add(url, scan_stats)
+        RUN_STATS.add_bytes('get', scan_stats['bytes_read'])
+        page_text = scan_stats.pop('text')
+        found.update(gtm_ids(tags))
+        validators = {
+            'etag': resp.headers.get('ETag'),
+            'last_modified': resp.headers.get('Last-Modified'),
+            'content_hash': hasher.hexdigest(),
+        }
     except (aiohttp.ClientError, asyncio.TimeoutError):
         print(f"[WARN] HTTP issue for {url}; will try Selenium")
     except Exception as e:
         print(f"[WARN] Unhandled HTTP exception for {url}: {e}")
 
-    if found:
-        return list(found)
+    # Same body as last run and the scan found nothing: the cached IDs already
+    # include any fallback results. Needs a real hash from a successful GET;
+    # the hash covers only the start of the body, so IDs found here win
+    content_hash = validators.get('content_hash')
+    if cached and not found and content_hash and content_hash == cached['content_hash']:
+        RESPONSE_CACHE.revalidated(url)
+        return cached['ids']
 
-    # 2) Selenium fallback
-    print(f"[INFO] Selenium fallback for {url}")
-    async with SEL_FALLBACK_SEMAPHORE:
-        loop = asyncio.get_running_loop()
-        ids = await loop.run_in_executor(None, extract_gtm_id_selenium, url) or []
-    if ids:
-        return ids
+    RUN_STATS.count('pages')
+    if found:
+        RUN_STATS.count('http')
+        entry = {'ids': list(found)}
+    elif page_text:
+        # One fallback run per distinct body; copies reuse it, Chrome included.
+        # Same HTML loading its own /app.js can mean different IDs on another site
+        site = extract_main_domain(url)
+        scope = site if first_party_script_urls(page_text, url) else ''
+        entry, hit = await BODY_MEMO.resolve(
+            body_key(page_text, scope), lambda: fallback_tiers(session, url, page_text), site=site
+        )
+        if hit:
+            RUN_STATS.count('memo')
+    else:
+        entry = await fallback_tiers(session, url, page_text)
+    ids = list(entry['ids'])
+
+    # A crashed Chrome run is no verdict: next run tries again
+    if entry.get('healthy', True):
+        RESPONSE_CACHE.store(url, ids, **validators)
+    return ids
+
+# Liveness probes in flight at once for a single domain
+PROBE_CONCURRENCY = 10
+# HEAD responses that usually mean "HEAD not supported" rather than "dead"
+HEAD_REJECTED_STATUSES = {403, 405, 501}
+
+async def probe_url(session, url):
+    """
+    Return True if the URL answers a HEAD, or a one-byte ranged GET when
+    the server rejects HEAD. A host that is still throttling after retries
+    is up, so it counts as alive.
+    """
+    try:
+        async with await request_with_retry(
+            session, 'HEAD', url, RATE_LIMITER, timeout=5, allow_redirects=True
+        ) as r:
+            if 200 <= r.status < 400 or r.status in RETRY_STATUSES:
+                return True
+            if r.status not in HEAD_REJECTED_STATUSES:
+                return False
+    except (asyncio.TimeoutError, aiohttp.ClientConnectorError) as e:
+        RUN_STATS.error('probe', e)
+        return False
+    except Exception as e:
+        RUN_STATS.error('probe', e)
 
-    # 3) HTML-regex fallback
-    print(f"[INFO] HTML-regex fallback for {url}")
-    return fetch_gtm_ids_from_html(url)
+    try:
+        headers = {'Range': 'bytes=0-0'}
+        async with await request_with_retry(
+            session, 'GET', url, RATE_LIMITER, headers=headers, timeout=5, allow_redirects=True
+        ) as r:
+            return 200 <= r.status < 400 or r.status == 416
+    except Exception as e:
+        RUN_STATS.error('probe', e)
+        return False
 
-async def process_url_gtm(session, url, results):
-    ids = await fetch_gtm_ids(session, url)
-    if ids:
-        results[url].extend(ids)
+async def process_domain_gtm(session, base_domain, subdomains, include_base=True):
+    """
+    Probe the domain and its subdomains concurrently; each URL that answers
+    goes straight on to GET+fallback for GTM. URLs another row already
+    probed and scanned come from WORK_INDEX without any request. With
+    PRIORITY_SCAN, SCHEDULER scans the apex and www first and stops once
+    it is confident or out of time.
+    """
+    urls = ([f"https://{base_domain}"] if include_base else []) + subdomains
+    probe_sem = asyncio.Semaphore(PROBE_CONCURRENCY)
+    results = defaultdict(list)
+
+    async def probe_then_fetch(u):
+        async with probe_sem:
+            with RUN_STATS.timed('probe'):
+                alive = await probe_url(session, u)
+        return await fetch_gtm_ids(session, u) if alive else []
+
+    async def probe_then_scan(u):
+        ids = await WORK_INDEX.get(u, probe_then_fetch)
+        if ids:
+            results[u].extend(ids)
+
+    if PRIORITY_SCAN:
+        ids, _ = await SCHEDULER.scan(urls, base_domain, lambda u: WORK_INDEX.get(u, probe_then_fetch))
+        return ids
+    await asyncio.gather(*(probe_then_scan(u) for u in urls))
+    return list({tag for tags in results.values() for tag in tags})
 
-async def process_domain_gtm(base_domain, subdomains):
+# -------------------------------------------------------------------
+# Shared HTTP session: one connection pool for the whole run
+# -------------------------------------------------------------------
+HTTP_LIMIT = 100             # total open sockets across all hosts
+HTTP_LIMIT_PER_HOST = 5      # open sockets per host
+HTTP_DNS_CACHE_TTL = 300     # seconds to keep resolved addresses
+HTTP_KEEPALIVE_TIMEOUT = 30  # seconds an idle socket stays open for reuse
+HTTP_VERIFY_SSL = True       # False only for local test servers with self-signed certs
+
+def connection_trace_config(stats):
+    """Count new versus reused pooled connections into `stats`."""
+    trace = aiohttp.TraceConfig()
+
+    async def on_create(session, ctx, params):
+        stats['new'] += 1
+
+    async def on_reuse(session, ctx, params):
+        stats['reused'] += 1
+
+    trace.on_connection_create_end.append(on_create)
+    trace.on_connection_reuseconn.append(on_reuse)
+    return trace
+
+def make_session(stats):
+    """Create the single ClientSession shared by every domain in a run."""
+    connector = aiohttp.TCPConnector(
+        limit=HTTP_LIMIT,
+        limit_per_host=HTTP_LIMIT_PER_HOST,
+        ttl_dns_cache=HTTP_DNS_CACHE_TTL,
+        keepalive_timeout=HTTP_KEEPALIVE_TIMEOUT,
+        resolver=make_aiohttp_resolver(DNS_CACHE),
+        ssl=HTTP_VERIFY_SSL,
+    )
+    return aiohttp.ClientSession(
+        headers={'User-Agent': 'Mozilla/5.0'},
+        connector=connector,
+        trace_configs=[connection_trace_config(stats)],
+    )
+
+# Rows scanned at once, rows in subdomain discovery / DNS at once, and
+# whether the stages are pipelined (False: discover every row, then scan)
+SCAN_CONCURRENCY = 10
+DISCOVERY_CONCURRENCY = 10
+DNS_ROW_CONCURRENCY = 20
+PIPELINED = True
+
+async def scan_entry(session, entry):
+    if entry.website == 'N/A':
+        entry.discovered_gtm_ids = ()
+    else:
+        with RUN_STATS.timed('domain'):
+            entry.discovered_gtm_ids = tuple(await process_domain_gtm(
+                session, entry.base_domain, list(entry.subdomains_to_scan()),
+                include_base=entry.base_resolves,
+            ))
+
+async def resolve_entry(entry):
     """
-    Prune subdomains by HEAD check, then GET+fallback for GTM.
+    DNS stage: resolve the row's hosts once and drop the ones that are NXDOMAIN
+    before any HEAD/GET (or Chrome) work is spent on them. Only the scan list
+    shrinks; found_subdomains still goes to the journal and the sheet.
     """
-    connector = aiohttp.TCPConnector(limit_per_host=5)
-    headers = {'User-Agent': 'Mozilla/5.0'}
-    async with aiohttp.ClientSession(headers=headers, connector=connector) as session:
-        urls = [f"https://{base_domain}"] + subdomains
-
-        live = []
-        for u in urls:
-            try:
-                async with session.head(u, timeout=5, allow_redirects=True) as r:
-                    if 200 <= r.status < 400:
-                        live.append(u)
-            except Exception:
-                pass
-
-        if not live:
-            return []
-
-        results = defaultdict(list)
-        await asyncio.gather(*(process_url_gtm(session, u, results) for u in live))
-        return list({tag for tags in results.values() for tag in tags})
-
-async def main_gtm_processing(domain_dict):
+    if entry.website == 'N/A':
+        return
+    subs = entry.found_subdomains
+    with RUN_STATS.timed('dns'):
+        answers = await DNS_CACHE.resolve_many(
+            [entry.base_domain] + [urlparse(u).hostname for u in subs]
+        )
+    entry.base_resolves = answers.get(entry.base_domain.lower()) != []
+    entry.scan_subdomains = tuple(
+        u for u in subs if answers.get((urlparse(u).hostname or '').lower()) != []
+    )
+
+# Checkpoint journal: one JSON line per finished row, replayed by --resume.
+# It is also where the write-back reads results from, so finished rows don't
+# have to stay in memory for the rest of the run.
+RUN_JOURNAL = RunJournal('GTM_updated.journal.jsonl')
+JOURNAL_FIELDS = ('organization', 'gtm_ids', 'found_subdomains', 'discovered_gtm_ids')
+
+def checkpoint(entry):
+    # Rows cut off by the run deadline empty-handed are left for --resume
+    if not entry.discovered_gtm_ids and past_deadline():
+        RUN_STATS.count('deferred')
+        return
+    RUN_JOURNAL.record(int(entry.row), website=entry.website, **entry.record(JOURNAL_FIELDS))
+    RUN_STATS.count('rows')
+
+def load_results():
+    """{row: RowResult} for every row the journal has finished."""
+    return RUN_JOURNAL.load(RowResult.from_record)
+
+def summarize_tiers(tiers):
+    pages, chrome = tiers.get('pages', 0), tiers.get('chrome', 0)
+    rate = chrome / pages * 100 if pages else 0.0
+    return (f"Tiers: {pages} pages fetched, {tiers.get('http', 0)} settled by plain HTTP, "
+            f"{tiers.get('js', 0)} by static JS, {tiers.get('memo', 0)} by the body memo, "
+            f"{chrome} escalated to Chrome ({rate:.0f}%)")
+
+# Machine-readable JSON run report written at the end of main()
+RUN_REPORT_PATH = 'GTM_updated.report.json'
+
+def run_report_sections():
+    """This process's cache, DNS and rate limiter numbers for the run report."""
+    return {
+        'http_cache': dict(RESPONSE_CACHE.stats),
+        'dns': dict(DNS_CACHE.stats),
+        'rate_limiter': dict(RATE_LIMITER.stats),
+        'work_index': dict(WORK_INDEX.stats),
+        'body_memo': dict(BODY_MEMO.stats),
+        **({'priority': dict(SCHEDULER.stats)} if PRIORITY_SCAN else {}),
+    }
+
+def print_scan_summary(stats):
+    total = stats['new'] + stats['reused']
+    reuse = stats['reused'] / total * 100 if total else 0.0
+    print(f"[INFO] Connections: {stats['new']} new, {stats['reused']} reused ({reuse:.0f}% reuse)")
+    print(f"[INFO] {DNS_CACHE.summary()}")
+    print(f"[INFO] {SCAN_STATS.summary()}")
+    print(f"[INFO] {RESPONSE_CACHE.summary()}")
+    print(f"[INFO] {RATE_LIMITER.summary()}")
+    print(f"[INFO] {WORK_INDEX.summary()}")
+    print(f"[INFO] {BODY_MEMO.summary()}")
+    if PRIORITY_SCAN:
+        print(f"[INFO] {SCHEDULER.summary()}")
+        if RUN_STATS.counters.get('deferred'):
+            print(f"[INFO] {RUN_STATS.counters['deferred']} rows deferred by the run deadline (use --resume)")
+    print(f"[INFO] {summarize_tiers(RUN_STATS.counters)}")
+
+async def main_gtm_processing(entries):
     print("[INFO] Starting GTM ID discovery...")
-    sem = asyncio.Semaphore(10)
+    sem = asyncio.Semaphore(SCAN_CONCURRENCY)
+    stats = {'new': 0, 'reused': 0}
 
-    async def handle(idx, entry):
-        async with sem:
-            if entry['website'] == 'N/A':
-                entry['discovered_gtm_ids'] = []
-            else:
-                entry['discovered_gtm_ids'] = await process_domain_gtm(
-                    entry['base_domain'], entry.get('found_subdomains', [])
-                )
+    async with make_session(stats) as session:
+        async def handle(entry):
+            async with sem:
+                await scan_entry(session, entry)
+            checkpoint(entry)
+
+        await asyncio.gather(*(handle(e) for e in entries))
 
-    await asyncio.gather(*(handle(i, e) for i, e in domain_dict.items()))
+    print_scan_summary(stats)
     print("[INFO] GTM ID discovery complete!\n")
 
-def debug_fallback_live(url):
+def combine_subdomains(entry):
+    """Combine the sheet's (already normalized) subdomains with the discovered ones."""
+    entry.found_subdomains = merge_subdomains(entry.subdomains, entry.found_subdomains)
+
+async def discover_then_scan(entries):
     """
-    Do a final pass in non-headless mode, capturing gtm.js network requests,
-    as in a debug/interactive scenario. Returns a list of GTM IDs found.
+    Two-phase flow: subfinder for every row, then GTM scanning for every row.
+    Needs every row in memory at once, unlike pipeline_scan.
     """
-    found_ids = set()
-    chrome_options = Options()
-    chrome_options.headless = False  # Run with a visible browser
-    chrome_options.add_argument("--auto-open-devtools-for-tabs")
-    chrome_options.set_capability("goog:loggingPrefs", {"performance": "ALL"})
+    entries = list(entries)
 
-    driver = webdriver.Chrome(options=chrome_options)
-    driver.set_page_load_timeout(30)
-    driver.execute_cdp_cmd("Network.enable", {})
+    # Discover subdomains only for rows we didn't skip, once per base domain
+    print("[INFO] Discovering subdomains...")
+    domains = {e.base_domain for e in entries if e.base_domain != 'N/A'}
+    with RUN_STATS.timed('discovery'):
+        raw_by_domain = await enumerate_subdomains(domains, DISCOVERY_CONCURRENCY)
+    for entry in entries:
+        dom = entry.base_domain
+        entry.found_subdomains = filter_subdomains(dom, raw_by_domain.get(dom, []))
+        combine_subdomains(entry)
+    print("[INFO] Subdomain discovery complete!\n")
 
-    try:
-        driver.get(url)
-        # Reduced wait time to 5 seconds
-        time.sleep(5)
-
-        logs = driver.get_log("performance")
-        for entry in logs:
-            msg = entry.get("message", "")
-            try:
-                payload = json.loads(msg)["message"]
-                if (payload.get("method") == "Network.requestWillBeSent"
-                   and "gtm.js?id=" in payload["params"]["request"]["url"]):
-                    m = re.search(r'id=(GTM-[A-Z0-9\\-]{4,})', payload["params"]["request"]["url"])
-                    if m:
-                        found_ids.add(m.group(1))
-            except:
-                pass
-
-        # Also check final page_source in case the snippet is inline
-        page_source = driver.page_source
-        for tag in re.findall(r'gtm\\.js\\?id=(GTM-[A-Z0-9\\-]{4,})', page_source, re.IGNORECASE):
-            found_ids.add(tag)
-        for tag in re.findall(r'ns\\.html\\?id=(GTM-[A-Z0-9\\-]{4,})', page_source, re.IGNORECASE):
-            found_ids.add(tag)
+    # Resolve every candidate host once, dropping NXDOMAIN before any HTTP
+    await asyncio.gather(*(resolve_entry(e) for e in entries))
 
-    except Exception as e:
-        print(f"[WARN] debug_fallback_live failed for {url}: {e}")
-    finally:
-        driver.quit()
+    await main_gtm_processing(entries)
 
-    return list(found_ids)
+async def pipeline_scan(entries):
+    """
+    Pipelined flow: a row is GTM-scanned as soon as its own subdomains are
+    known, while other rows are still in subfinder. `entries` is consumed
+    lazily, so rows are read from the sheet only as the pipeline has room.
+    """
+    print("[INFO] Discovering subdomains and GTM IDs (pipelined)...")
+    runner = SubfinderRunner(DISCOVERY_CONCURRENCY)
+    stats = {'new': 0, 'reused': 0}
+
+    async with make_session(stats) as session:
+        async def discover(entry):
+            dom = entry.base_domain
+            raw = []
+            if dom != 'N/A' and not past_deadline():
+                with RUN_STATS.timed('subfinder'):
+                    raw = await runner.get(dom)
+            entry.found_subdomains = filter_subdomains(dom, raw)
+            combine_subdomains(entry)
+
+        async def scan(entry):
+            await scan_entry(session, entry)
+            checkpoint(entry)
+
+        await run_pipeline(entries, [
+            ('discovery', discover, DISCOVERY_CONCURRENCY),
+            ('dns', resolve_entry, DNS_ROW_CONCURRENCY),
+            ('scan', scan, SCAN_CONCURRENCY),
+        ], describe=lambda e: e.website)
+
+    print(f"[INFO] {runner.summary()}")
+    print_scan_summary(stats)
+    print("[INFO] GTM ID discovery complete!\n")
 
-def main():
-    df = pd.read_csv('GTM.csv')
-    df['GTM  ID'] = df['GTM  ID'].fillna('').astype(str)
-    df['Subdomain(s)'] = df.get('Subdomain(s)', pd.Series('')).fillna('').astype(str)
-    df.fillna({"Website": 'N/A'}, inplace=True)
-
-    # Build domain dictionary, skipping rows with 'N/A' or existing GTM IDs
-    domain_dictionary = {}
-    for idx, row in df.iterrows():
-        website = row['Website'].strip()
-        gtm_current = row['GTM  ID'].strip()
-        # Skip if website == 'N/A' or if there's already a GTM ID
-        if website == 'N/A' or gtm_current:
-            continue
+# -------------------------------------------------------------------
+# Deep scan: a last, concurrent headless pass over rows still missing an ID
+# -------------------------------------------------------------------
+DEEP_SCAN_WORKERS = 3      # Chrome drivers (and pages) scanned at once
+DEEP_SCAN_TIMEOUT = 15     # seconds one page may take to request gtm.js
+DEEP_SCAN_BUDGET = 300     # seconds for the whole pass; rows not started by then are skipped
 
-        gtm0 = [x.strip() for x in row['GTM  ID'].split(',') if x.strip()]
-        subs0 = [x.strip() for x in row['Subdomain(s)'].split(',') if x.strip()]
-        base = extract_main_domain(website) if website != 'N/A' else 'N/A'
-        domain_dictionary[idx] = {
-            'website': website,
-            'base_domain': base,
-            'found_subdomains': [],
-            'discovered_gtm_ids': [],
-            'gtm_ids': gtm0,
-            'subdomains': subs0
-        }
+def deep_scan(targets, workers=DEEP_SCAN_WORKERS, budget=DEEP_SCAN_BUDGET):
+    """
+    Scan {row: url} with `workers` full-profile (nothing blocked) headless
+    Chrome drivers, capturing network events over CDP and stopping each page
+    at the first gtm.js request. The pass ends after `budget` seconds: pages
+    in flight get only the time left, pages not yet started are skipped.
+    Returns ({row: ids} for the rows where something was found, stats).
+    """
+    pool = ChromeDriverPool(size=workers, lean=False)
+    deadline = time.monotonic() + budget
+    stats = {'rows': len(targets), 'found': 0, 'skipped': 0, 'failed': 0}
+    found = {}
+
+    def scan(url):
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return None
+        with RUN_STATS.timed('deep_scan'):
+            return _extract_gtm_id_selenium(url, pool, min(DEEP_SCAN_TIMEOUT, remaining))
+
+    start = time.monotonic()
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {executor.submit(scan, url): row for row, url in targets.items()}
+            for future in as_completed(futures):
+                try:
+                    ids = future.result()
+                except Exception as e:
+                    stats['failed'] += 1
+                    print(f"[WARN] Deep scan failed for {targets[futures[future]]}: {e}")
+                    continue
+                if ids is None:
+                    stats['skipped'] += 1
+                elif ids:
+                    found[futures[future]] = sorted(ids)
+    finally:
+        pool.close()
+    stats['found'] = len(found)
+    stats['elapsed_seconds'] = round(time.monotonic() - start, 3)
+    return found, stats
 
-    # Discover subdomains only for rows we didn't skip
-    print("[INFO] Discovering subdomains...")
-    def proc_sub(idx):
-        dom = domain_dictionary[idx]['base_domain']
-        return idx, (get_filtered_subdomains(dom) if dom != 'N/A' else [])
-    with ThreadPoolExecutor(max_workers=10) as ex:
-        results = list(ex.map(proc_sub, domain_dictionary))
-        for idx, found in results:
-            domain_dictionary[idx]['found_subdomains'] = found
-    print("[INFO] Subdomain discovery complete!\n")
+def iter_work_items(path, chunksize=CSV_CHUNK_SIZE):
+    """
+    Stream the sheet and yield one WorkItem per row that needs scanning,
+    skipping rows with 'N/A' or existing GTM IDs.
+    """
+    for chunk in read_sheet_chunks(path, chunksize):
+        websites = text_column(chunk, 'Website', 'N/A')
+        gtm_cells = text_column(chunk, 'GTM  ID')
+        # Skip if website == 'N/A' or if there's already a GTM ID
+        todo = (websites != 'N/A') & (gtm_cells == '')
+        for idx, website, subs, org in zip(
+            chunk.index[todo], websites[todo],
+            text_column(chunk, 'Subdomain(s)')[todo],
+            text_column(chunk, 'Organization Name')[todo],
+        ):
+            yield WorkItem(idx, org, website, extract_main_domain(website), split_cell(subs))
+
+def merged_gtm_ids(record):
+    merged = list(dict.fromkeys(record.gtm_ids + record.discovered_gtm_ids))
+    if "No Tag" in merged and len(merged) > 1:
+        merged = [m for m in merged if m != "No Tag"]
+    return merged
+
+def apply_settings(progress=False, priority=False, deadline=None, confidence=None):
+    """Apply command-line settings to this module (main process or shard worker)."""
+    global PRIORITY_SCAN
+    RUN_STATS.progress = progress
+    # A deadline only means something for the priority scheduler
+    PRIORITY_SCAN = priority or deadline is not None
+    SCHEDULER.run_budget = deadline
+    if confidence is not None:
+        SCHEDULER.confidence = confidence
+
+def main(resume=False, workers=1, report_path=RUN_REPORT_PATH, deep_scan_workers=DEEP_SCAN_WORKERS,
+         settings=None):
+    # Rows are streamed from the sheet straight into the scan
+    work_items = iter_work_items('GTM.csv')
+    if PRIORITY_SCAN:
+        # Start the run clock here, so the deep scan below counts against --deadline
+        SCHEDULER.run_remaining()
+
+    # With --resume, rows already in the journal are not scanned again
+    if resume:
+        done = load_results()
+        work_items = (e for e in work_items
+                      if getattr(done.get(e.row), 'website', None) != e.website)
+        print(f"[INFO] Resuming: {len(done)} rows already done")
+
+    # Subdomain discovery + async GTM extraction
+    flow = pipeline_scan if PIPELINED else discover_then_scan
+    if workers > 1:
+        # One process per shard of base domains, each with its own loop and Chrome pool
+        run_sharded('DynamicReader', 'GTM.csv', workers, RUN_JOURNAL.path, resume,
+                    stats=RUN_STATS, settings=settings)
+    else:
+        RUN_JOURNAL.start(resume)
+        try:
+            asyncio.run(flow(work_items))
+        finally:
+            RUN_JOURNAL.close()
+            SELENIUM_POOL.close()
+            RESPONSE_CACHE.close()
+            BODY_MEMO.close()
 
-    # Normalize and combine subdomains
-    for idx, entry in domain_dictionary.items():
-        combined = set(entry['subdomains']) | set(entry['found_subdomains'])
-        entry['found_subdomains'] = [
-            s if s.startswith('https://') else f"https://{s}"
-            for s in combined
-        ]
-
-    # Async GTM extraction
-    asyncio.run(main_gtm_processing(domain_dictionary))
-
-    # Merge results back into DataFrame
-    for idx, entry in domain_dictionary.items():
-        merged = list(dict.fromkeys(entry['gtm_ids'] + entry['discovered_gtm_ids']))
-        if "No Tag" in merged and len(merged) > 1:
-            merged = [m for m in merged if m != "No Tag"]
-        df.at[idx, 'GTM  ID'] = ', '.join(merged)
-        df.at[idx, 'Subdomain(s)'] = ', '.join(entry['found_subdomains'])
+    # Final results come from the journal (covers earlier, resumed runs too)
+    results = load_results()
+    gtm_by_row = {row: ', '.join(merged_gtm_ids(r)) for row, r in results.items()}
 
     # --- Immediate visibility on failures ---
-    missing_mask = df['GTM  ID'].str.strip() == ''
-    missing_count = missing_mask.sum()
-    print(f"[INFO] {missing_count} rows still have no GTM ID")
-    if missing_count:
-        print(df.loc[missing_mask, ['Organization Name', 'Website']].to_string(index=False))
-        # Final debug pass for rows that remain blank, main domain only
-        print(f"[INFO] Attempting final debug fallback pass for {missing_count} rows...")
-        for idx, row in df[missing_mask].iterrows():
-            url = row['Website']
-            if not url.lower().startswith('http'):
-                url = f"https://{url}"
-            found = debug_fallback_live(url)
-            if found:
-                df.at[idx, 'GTM  ID'] = ', '.join(found)
-        still_missing_mask = df['GTM  ID'].str.strip() == ''
-        still_missing_count = still_missing_mask.sum()
-        print(f"[INFO] After debug fallback, {still_missing_count} rows are still missing GTM IDs")
-
-    # Write out updated CSV
-    df.to_csv('GTM_updated.csv', index=False)
+    missing = sorted(row for row, gtm in gtm_by_row.items() if not gtm)
+    print(f"[INFO] {len(missing)} rows still have no GTM ID")
+    deep_report = None
+    if missing:
+        print(pd.DataFrame(
+            [(results[row].organization, results[row].website) for row in missing],
+            columns=['Organization Name', 'Website'],
+        ).to_string(index=False))
+        # Final deep scan for rows that remain blank, main domain only,
+        # within whatever --deadline leaves
+        deep_budget = DEEP_SCAN_BUDGET
+        run_left = SCHEDULER.run_remaining() if PRIORITY_SCAN else None
+        if run_left is not None:
+            deep_budget = max(0, min(deep_budget, run_left))
+        print(f"[INFO] Deep scanning {len(missing)} rows "
+              f"({deep_scan_workers} at a time, {deep_budget:.0f}s budget)...")
+        targets = {}
+        for row in missing:
+            url = results[row].website
+            targets[row] = url if url.lower().startswith('http') else f"https://{url}"
+        deep_found, deep_stats = deep_scan(targets, deep_scan_workers, deep_budget)
+        for row, ids in deep_found.items():
+            gtm_by_row[row] = ', '.join(ids)
+        deep_report = dict(deep_stats, ids={str(row): ids for row, ids in deep_found.items()})
+        print(f"[INFO] Deep scan: {deep_stats['found']} of {deep_stats['rows']} rows found, "
+              f"{deep_stats['skipped']} skipped by the budget, {deep_stats['failed']} failed, "
+              f"{deep_stats['elapsed_seconds']:.1f}s")
+        still_missing_count = sum(1 for row in missing if not gtm_by_row[row])
+        print(f"[INFO] After the deep scan, {still_missing_count} rows are still missing GTM IDs")
+
+    # Write out updated CSV, streaming the sheet and filling results in per chunk
+    write_sheet('GTM.csv', 'GTM_updated.csv', {
+        'GTM  ID': gtm_by_row,
+        'Subdomain(s)': {row: ', '.join(r.found_subdomains) for row, r in results.items()},
+    }, fill={'Website': 'N/A'})
     print("[INFO] CSV updated and saved to 'GTM_updated.csv'\n")
 
+    # Per-stage timings and counters; sharded runs carry each shard's sections
+    if report_path:
+        sections = run_report_sections() if workers <= 1 else {}
+        if deep_report:
+            sections['deep_scan'] = deep_report
+        RUN_STATS.write_report(report_path, workers=workers, **sections)
+
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description='Find GTM IDs for the sites in GTM.csv.')
+    parser.add_argument('--resume', action='store_true',
+                        help='Skip rows already recorded in the checkpoint journal')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='Worker processes, each scanning a shard of base domains (default: 1)')
+    parser.add_argument('--report', default=RUN_REPORT_PATH,
+                        help=f"Where to write the JSON run report (default: {RUN_REPORT_PATH})")
+    parser.add_argument('--progress', action='store_true',
+                        help='Show a live progress line on stderr')
+    parser.add_argument('--deep-scan-workers', type=int, default=DEEP_SCAN_WORKERS,
+                        help=f"Headless Chrome pages in the final deep scan at once (default: {DEEP_SCAN_WORKERS})")
+    parser.add_argument('--priority', action='store_true',
+                        help='Scan each row apex/www first and stop once confident (see scanPriority.py)')
+    parser.add_argument('--deadline', type=float, default=None,
+                        help='Seconds for the whole scan; implies --priority. Rows left over wait for --resume')
+    parser.add_argument('--confidence', type=float, default=SCHEDULER.confidence,
+                        help=f"Share of a row's expected value to scan before stopping on a find (default: {SCHEDULER.confidence})")
+    args = parser.parse_args()
+    settings = {'progress': args.progress, 'priority': args.priority,
+                'deadline': args.deadline, 'confidence': args.confidence}
+    apply_settings(**settings)
+    main(resume=args.resume, workers=args.workers, report_path=args.report,
+         deep_scan_workers=args.deep_scan_workers, settings=settings)
@@ -1,11 +1,22 @@
-import pandas as pd
-import subprocess
 from urllib.parse import urlparse
 import asyncio
+import argparse
 import aiohttp
 from collections import defaultdict
-import re
-from concurrent.futures import ThreadPoolExecutor
+import hashlib
+from dnsResolver import DNSCache, make_aiohttp_resolver
+from httpCache import ResponseCache, cache_path
+from rateLimiter import HostRateLimiter, RETRY_STATUSES, request_with_retry
+from runJournal import RunJournal
+from runStats import RunStats
+from scanPipeline import run_pipeline
+from scanPriority import PriorityScheduler
+from shardRunner import run_sharded
+from sheetIO import CSV_CHUNK_SIZE, read_sheet_chunks, split_cell, text_column, write_sheet
+from subfinderCache import SubfinderRunner, enumerate_subdomains
+from workIndex import WorkIndex
+from workItem import RowResult, WorkItem, merge_subdomains
+from tagDetector import ScanTotals, gtm_ids, gtm_ids_from_urls, scan_response
 
 # NOTE: pandas, subprocess, and numpy must be downloaded in environment 
 
@@ -30,67 +41,78 @@ def extract_main_domain(url):
         return '.'.join(domain_parts[-2:]).lower()
     return netloc.lower()
 
-def get_filtered_subdomains(domain):
+def filter_subdomains(domain, raw_subdomains):
     """
-    Run subfinder for a domain, then filter out unwanted subdomains.
+    Filter raw subfinder output for a domain, dropping unwanted subdomains.
     Returns a list of subdomain URLs with `https://` prefix.
     """
-    try:
-        result = subprocess.run(
-            ['subfinder', '-d', domain, '-silent'],
-            capture_output=True,
-            text=True,
-            timeout=120
-        )
-        if result.returncode != 0:
-            print(f"[WARN] Subfinder error for {domain}: {result.stderr}")
-            return []
-        
-        raw_subdomains = result.stdout.splitlines()
-        if not raw_subdomains:
-            return []
-        
-        exclude_prefixes = {
-            'www.', 'ns.', 'mail.', 'webdisk.', 'cpanel.',
-            'cpcalenders.', 'webmail.', 'cpcontacts.',
-            'rent.', 'rentnow.', 'ww2.', 'autodiscover.',
-            'email.', 'lp.', 'child.', 'cpcalendars',
-            'dev.', 'landing.'
-        }
-        
-        filtered = []
-        for sub in raw_subdomains:
-            # Remove protocol if present
-            if sub.startswith('http'):
-                parsed = urlparse(sub)
-                hostname = parsed.netloc
-            else:
-                hostname = sub.split('/')[0]
-            
-            # Remove port if present
-            hostname = hostname.split(':')[0]
-            
-            # Avoid base domain and typical excluded prefixes
-            if hostname == domain or hostname == f"www.{domain}":
-                continue
-            if any(hostname.startswith(prefix) for prefix in exclude_prefixes):
-                continue
-            
-            # Add https:// prefix
-            filtered.append(f"https://{hostname}")
-        return filtered
-    
-    except subprocess.TimeoutExpired:
-        print(f"[WARN] Subfinder timed out for {domain}")
-        return []
-    except Exception as e:
-        print(f"[WARN] Error processing subdomains for {domain}: {e}")
+    if not raw_subdomains:
         return []
 
+    exclude_prefixes = {
+        'www.', 'ns.', 'mail.', 'webdisk.', 'cpanel.',
+        'cpcalenders.', 'webmail.', 'cpcontacts.',
+        'rent.', 'rentnow.', 'ww2.', 'autodiscover.',
+        'email.', 'lp.', 'child.', 'cpcalendars',
+        'dev.', 'landing.'
+    }
+
+    filtered = []
+    for sub in raw_subdomains:
+        # Remove protocol if present
+        if sub.startswith('http'):
+            parsed = urlparse(sub)
+            hostname = parsed.netloc
+        else:
+            hostname = sub.split('/')[0]
+
+        # Remove port if present
+        hostname = hostname.split(':')[0]
+
+        # Avoid base domain and typical excluded prefixes
+        if hostname == domain or hostname == f"www.{domain}":
+            continue
+        if any(hostname.startswith(prefix) for prefix in exclude_prefixes):
+            continue
+
+        # Add https:// prefix
+        filtered.append(f"https://{hostname}")
+    return filtered
+
+# Bytes read / peak buffer totals from the streaming scanner
+SCAN_STATS = ScanTotals()
+
+# Per-stage latency, bytes and errors, plus run counters (rows finished, ...)
+RUN_STATS = RunStats()
+
+# Tag IDs + validators from this reader's previous runs (opened on first use)
+RESPONSE_CACHE = ResponseCache(cache_path('gro'))
+
+# Shared DNS answers for the DNS stage and the aiohttp session
+DNS_CACHE = DNSCache()
+
+# Adaptive request budget per host and per IP (shared CDN/WAF front ends)
+RATE_LIMITER = HostRateLimiter(addresses=lambda host: DNS_CACHE.cached(host))
+
+# One fetch per canonical URL per run, shared by every row that lists it
+WORK_INDEX = WorkIndex()
+
+# Apex/www-first scanning under a per-row and run-wide time budget (--priority)
+PRIORITY_SCAN = False
+SCHEDULER = PriorityScheduler()
+
+def past_deadline():
+    """
+    Return True once a priority run has used up its run-wide time budget.
+    """
+    return PRIORITY_SCAN and SCHEDULER.run_expired()
+
 async def fetch_gtm_ids(session, url):
     """
     Fetch GTM IDs from a URL by inspecting gtm.js requests or inline references.
-    Returns a list of found GTM IDs.
+    Returns a list of found GTM IDs. A fresh cache entry or a 304 from the
+    server reuses the IDs from the previous run without parsing. 429/503
+    answers are retried with backoff and never cached as "no GTM ID".
     """
     try:
         headers = {
@@ -100,27 +122,44 @@ async def fetch_gtm_ids(session, url):
         }
         found_ids = set()
 
-        async with session.get(url, headers=headers, allow_redirects=True, timeout=10) as response:
-            final_url = str(response.url)
-
-            if 'gtm.js' in final_url and 'id=' in final_url:
-                match = re.search(r'id=(GTM-[A-Z0-9]{4,9})', final_url)
-                if match:
-                    found_ids.add(match.group(1))
-
-            for resp in response.history:
-                hist_url = str(resp.url)
-                if 'gtm.js' in hist_url and 'id=' in hist_url:
-                    match = re.search(r'id=(GTM-[A-Z0-9]{4,9})', hist_url)
-                    if match:
-                        found_ids.add(match.group(1))
-
-            html_text = await response.text()
-            pattern = re.compile(r"GTM-[A-Z0-9\-]{4,}")
-            inline_matches = pattern.findall(html_text)
-            for match in inline_matches:
-                found_ids.add(match)
-
+        cached = RESPONSE_CACHE.lookup(url)
+        if cached and cached['fresh']:
+            return cached['ids']
+        headers.update(RESPONSE_CACHE.conditional_headers(cached))
+
+        with RUN_STATS.timed('get'):
+            async with await request_with_retry(
+                session, 'GET', url, RATE_LIMITER,
+                headers=headers, allow_redirects=True, timeout=10
+            ) as response:
+                if response.status in RETRY_STATUSES:
+                    RUN_STATS.count('throttled')
+                    print(f"[WARN] Still throttled ({response.status}) for {url}")
+                    return cached['ids'] if cached else []
+
+                if response.status == 304 and cached:
+                    RESPONSE_CACHE.revalidated(url)
+                    return cached['ids']
+
+                # gtm.js?id= in the final URL or anywhere in the redirect chain
+                redirect_urls = [str(resp.url) for resp in response.history] + [str(response.url)]
+                found_ids.update(gtm_ids_from_urls(redirect_urls))
+
+                # Inline references, matched while streaming the body
+                hasher = hashlib.sha256()
+                tags, scan_stats = await scan_response(response, hasher=hasher)
+                SCAN_STATS.add(url, scan_stats)
+                found_ids.update(gtm_ids(tags))
+
+                RESPONSE_CACHE.store(
+                    url, found_ids,
+                    etag=response.headers.get('ETag'),
+                    last_modified=response.headers.get('Last-Modified'),
+                    content_hash=hasher.hexdigest(),
+                )
+
+        RUN_STATS.add_bytes('get', scan_stats['bytes_read'])
+        RUN_STATS.count('pages')
         return list(found_ids)
     except (aiohttp.ClientError, asyncio.TimeoutError):
         print(f"[WARN] Network/timeout issue for {url}")
@@ -132,14 +171,62 @@ async def fetch_gtm_ids(session, url):
 async def process_url_gtm(session, url, results_dict):
     """
     Process a single URL and store the found GTM IDs in results_dict[url].
+    A URL another row already scanned is answered from WORK_INDEX.
     """
-    gtm_ids = await fetch_gtm_ids(session, url)
+    gtm_ids = await WORK_INDEX.get(url, lambda u: fetch_gtm_ids(session, u))
     if gtm_ids:
         results_dict[url].extend(gtm_ids)
 
-async def process_domain_gtm(base_domain, found_subdomains):
+async def process_domain_gtm(session, base_domain, found_subdomains, include_base=True):
     """
     For one domain, gather GTM IDs from the domain plus any subdomains.
+    include_base=False skips the base domain (e.g. it did not resolve).
+    With PRIORITY_SCAN, SCHEDULER scans the apex and www first and stops
+    once it is confident or out of time.
+    """
+    domain_results = defaultdict(list)
+    all_urls = ([f"https://{base_domain}"] if include_base else []) + found_subdomains
+    if PRIORITY_SCAN:
+        gtm_ids, _ = await SCHEDULER.scan(
+            all_urls, base_domain,
+            lambda url: WORK_INDEX.get(url, lambda u: fetch_gtm_ids(session, u)),
+        )
+        return gtm_ids
+    tasks = [process_url_gtm(session, url, domain_results) for url in all_urls]
+    await asyncio.gather(*tasks)
+
+    all_found_ids = set()
+    for ids_list in domain_results.values():
+        all_found_ids.update(ids_list)
+
+    return list(all_found_ids)
+
+# Shared connection pool settings (one session per run)
+HTTP_LIMIT = 100             # total open sockets across all hosts
+HTTP_LIMIT_PER_HOST = 5      # open sockets per host
+HTTP_DNS_CACHE_TTL = 300     # seconds to keep resolved addresses
+HTTP_KEEPALIVE_TIMEOUT = 30  # seconds an idle socket stays open for reuse
+HTTP_VERIFY_SSL = True       # False only for local test servers with self-signed certs
+
+def connection_trace_config(stats):
+    """
+    Build a TraceConfig that counts new versus reused pooled connections.
+    """
+    trace = aiohttp.TraceConfig()
+
+    async def on_create(session, ctx, params):
+        stats['new'] += 1
+
+    async def on_reuse(session, ctx, params):
+        stats['reused'] += 1
+
+    trace.on_connection_create_end.append(on_create)
+    trace.on_connection_reuseconn.append(on_reuse)
+    return trace
+
+def make_session(stats):
+    """
+    Create the single ClientSession shared by every domain in a run.
     """
     headers = {
         'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64)'
@@ -148,134 +235,312 @@ async def process_domain_gtm(base_domain, found_subdomains):
         'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
         'Accept-Language': 'en-US,en;q=0.5',
     }
-    connector = aiohttp.TCPConnector(limit_per_host=5)
-    async with aiohttp.ClientSession(headers=headers, connector=connector) as session:
-        domain_results = defaultdict(list)
-        all_urls = [f"https://{base_domain}"] + found_subdomains
-        tasks = [process_url_gtm(session, url, domain_results) for url in all_urls]
-        await asyncio.gather(*tasks)
+    connector = aiohttp.TCPConnector(
+        limit=HTTP_LIMIT,
+        limit_per_host=HTTP_LIMIT_PER_HOST,
+        ttl_dns_cache=HTTP_DNS_CACHE_TTL,
+        keepalive_timeout=HTTP_KEEPALIVE_TIMEOUT,
+        resolver=make_aiohttp_resolver(DNS_CACHE),
+        ssl=HTTP_VERIFY_SSL,
+    )
+    return aiohttp.ClientSession(
+        headers=headers,
+        connector=connector,
+        trace_configs=[connection_trace_config(stats)],
+    )
+
+# Pipeline settings: rows scanned at once, rows in subdomain discovery and
+# DNS at once, and whether the stages overlap (False: discover, then scan)
+SCAN_CONCURRENCY = 10
+DISCOVERY_CONCURRENCY = 10
+DNS_ROW_CONCURRENCY = 20
+PIPELINED = True
+
+async def scan_entry(session, entry):
+    """
+    Gather GTM IDs for one row into entry.discovered_gtm_ids.
+    """
+    if entry.website == 'N/A':
+        entry.discovered_gtm_ids = ()
+        return
+    found_subdomains = list(entry.subdomains_to_scan())
+    with RUN_STATS.timed('domain'):
+        gtm_ids = await process_domain_gtm(session, entry.base_domain, found_subdomains, entry.base_resolves)
+    entry.discovered_gtm_ids = tuple(gtm_ids)
+
+async def resolve_entry(entry):
+    """
+    DNS stage: resolve the row's hosts once, concurrently, and drop NXDOMAIN
+    hosts before any HTTP work. Hosts whose lookup merely failed are kept.
+    """
+    if entry.website == 'N/A':
+        return
+    base_domain = entry.base_domain
+    found_subdomains = entry.found_subdomains
+    hosts = [base_domain] + [urlparse(url).hostname for url in found_subdomains]
+    with RUN_STATS.timed('dns'):
+        answers = await DNS_CACHE.resolve_many(hosts)
+
+    entry.base_resolves = answers.get(base_domain.lower()) != []
+    entry.scan_subdomains = tuple(
+        url for url in found_subdomains
+        if answers.get((urlparse(url).hostname or '').lower()) != []
+    )
+
+# Checkpoint journal: one JSON line per finished row, replayed by --resume.
+# The write-back also reads its results from here, so finished rows are not
+# kept in memory for the rest of the run.
+RUN_JOURNAL = RunJournal('DO_updated.journal.jsonl')
+JOURNAL_FIELDS = ('gtm_ids', 'subdomains', 'found_subdomains', 'discovered_gtm_ids')
+
+def checkpoint(entry):
+    """
+    Append a finished row's results to the journal. Rows the run deadline
+    cut off before any ID was found are left out, for --resume to pick up.
+    """
+    if entry.website != 'N/A' and not entry.discovered_gtm_ids and past_deadline():
+        RUN_STATS.count('deferred')
+        return
+    RUN_JOURNAL.record(int(entry.row), website=entry.website, **entry.record(JOURNAL_FIELDS))
+    RUN_STATS.count('rows')
 
-        all_found_ids = set()
-        for ids_list in domain_results.values():
-            all_found_ids.update(ids_list)
+def load_results():
+    """
+    Return {row: RowResult} for every row the journal has finished.
+    """
+    return RUN_JOURNAL.load(RowResult.from_record)
+
+# Machine-readable JSON run report written at the end of main()
+RUN_REPORT_PATH = 'DO_updated.report.json'
 
-        return list(all_found_ids)
+def run_report_sections():
+    """
+    Return this process's cache, DNS and rate limiter numbers for the run report.
+    """
+    return {
+        'http_cache': dict(RESPONSE_CACHE.stats),
+        'dns': dict(DNS_CACHE.stats),
+        'rate_limiter': dict(RATE_LIMITER.stats),
+        'work_index': dict(WORK_INDEX.stats),
+        **({'priority': dict(SCHEDULER.stats)} if PRIORITY_SCAN else {}),
+    }
 
-async def main_gtm_processing(domain_dictionary):
+def print_scan_summary(stats):
     """
-    Launch concurrent GTM checks for all domains in domain_dictionary.
+    Print connection reuse, scanner and cache statistics for the run.
+    """
+    total = stats['new'] + stats['reused']
+    reuse_pct = stats['reused'] / total * 100 if total else 0.0
+    print(f"[INFO] Connections: {stats['new']} new, {stats['reused']} reused ({reuse_pct:.0f}% reuse)")
+    print(f"[INFO] {DNS_CACHE.summary()}")
+    print(f"[INFO] {SCAN_STATS.summary()}")
+    print(f"[INFO] {RESPONSE_CACHE.summary()}")
+    print(f"[INFO] {RATE_LIMITER.summary()}")
+    print(f"[INFO] {WORK_INDEX.summary()}")
+    if PRIORITY_SCAN:
+        print(f"[INFO] {SCHEDULER.summary()}")
+        if RUN_STATS.counters.get('deferred'):
+            print(f"[INFO] {RUN_STATS.counters['deferred']} rows deferred by the run deadline (use --resume)")
+
+async def main_gtm_processing(entries):
+    """
+    Launch concurrent GTM checks for all rows in entries.
     """
     print("[INFO] Starting GTM ID discovery...")
-    sem = asyncio.Semaphore(10)
-
-    async def process_single_item(idx, entry):
-        async with sem:
-            if entry['website'] == 'N/A':
-                entry['discovered_gtm_ids'] = []
-                return
-            base_domain = entry.get('base_domain', '')
-            found_subdomains = entry.get('found_subdomains', [])
-            gtm_ids = await process_domain_gtm(base_domain, found_subdomains)
-            entry['discovered_gtm_ids'] = gtm_ids
-
-    tasks = []
-    for idx, entry in domain_dictionary.items():
-        tasks.append(process_single_item(idx, entry))
-    await asyncio.gather(*tasks)
-    print("[INFO] GTM ID discovery complete!\n")
+    sem = asyncio.Semaphore(SCAN_CONCURRENCY)
+    stats = {'new': 0, 'reused': 0}
+
+    async with make_session(stats) as session:
+        async def process_single_item(entry):
+            async with sem:
+                await scan_entry(session, entry)
+            checkpoint(entry)
+
+        tasks = []
+        for entry in entries:
+            tasks.append(process_single_item(entry))
+        await asyncio.gather(*tasks)
 
-def main():
-    # Read CSV
-    df = pd.read_csv('DO.csv')  # For demonstration, you can rename or override as needed
+    print_scan_summary(stats)
+    print("[INFO] GTM ID discovery complete!\n")
 
-    # Replace missing Website cells with 'N/A'
-    df.fillna({"Website": 'N/A'}, inplace=True)
+def combine_subdomains(entry):
+    """
+    Combine existing subdomains (normalized when the WorkItem was built)
+    with discovered subdomains.
+    """
+    entry.subdomains = merge_subdomains(entry.subdomains, entry.found_subdomains)
 
-    # Build a dictionary keyed by row index
-    domain_dictionary = {}
-    for idx, row in df.iterrows():
-        if pd.isna(row.get('GTM  ID', '')):
-            initial_gtm_ids = ()
-        else:
-            initial_gtm_ids = tuple(gtm.strip() for gtm in str(row['GTM  ID']).split(',') if gtm.strip())
-        
-        if pd.isna(row.get('Subdomain(s)', '')):
-            initial_subdomains = ()
-        else:
-            initial_subdomains = tuple(sub.strip() for sub in str(row['Subdomain(s)']).split(',') if sub.strip())
-        
-        website = row.get('Website', 'N/A').strip()
-
-        base_domain = 'N/A'
-        if website != 'N/A':
-            base_domain = extract_main_domain(website)
-
-        domain_dictionary[idx] = {
-            'organization': row.get('Organization Name', ''),
-            'website': website,
-            'subdomains': initial_subdomains,
-            'gtm_ids': initial_gtm_ids,
-            'base_domain': base_domain,
-            'found_subdomains': [],
-            'discovered_gtm_ids': []
-        }
+async def discover_then_scan(entries):
+    """
+    Two-phase flow: subfinder for every row first, then GTM checks for every row.
+    Holds every row in memory at once, unlike pipeline_scan.
+    """
+    entries = list(entries)
 
-    # Subdomain discovery
+    # Subdomain discovery (subfinder runs once per distinct base domain)
     print("[INFO] Discovering subdomains...")
-    def process_subdomains(idx):
-        entry = domain_dictionary[idx]
-        if entry['website'] == 'N/A':
-            return idx, []
-        domain = entry['base_domain']
-        found = get_filtered_subdomains(domain)
-        return idx, found
-
-    with ThreadPoolExecutor(max_workers=10) as executor:
-        results = executor.map(process_subdomains, domain_dictionary.keys())
+    domains = {
+        entry.base_domain for entry in entries
+        if entry.website != 'N/A'
+    }
+    with RUN_STATS.timed('discovery'):
+        raw_by_domain = await enumerate_subdomains(domains, DISCOVERY_CONCURRENCY)
 
-    for idx, found_subs in results:
-        domain_dictionary[idx]['found_subdomains'] = found_subs
+    for entry in entries:
+        if entry.website != 'N/A':
+            domain = entry.base_domain
+            entry.found_subdomains = filter_subdomains(domain, raw_by_domain.get(domain, []))
+        combine_subdomains(entry)
 
     print("[INFO] Subdomain discovery complete!\n")
 
-    # Combine existing subdomains with discovered subdomains
-    for idx, entry in domain_dictionary.items():
-        existing = set(entry['subdomains'])
-        discovered = set(entry['found_subdomains'])
+    # Resolve every candidate host once, dropping NXDOMAIN before any HTTP
+    await asyncio.gather(*(resolve_entry(entry) for entry in entries))
 
-        def standardize_subdomain(sub):
-            sub = sub.strip()
-            if not sub.startswith('https://'):
-                return f"https://{sub}"
-            return sub
+    # Asynchronously discover GTM IDs
+    await main_gtm_processing(entries)
 
-        standard_existing = {standardize_subdomain(s) for s in existing}
-        standard_discovered = {standardize_subdomain(s) for s in discovered}
-        combined = list(standard_existing.union(standard_discovered))
-        domain_dictionary[idx]['subdomains'] = combined
+async def pipeline_scan(entries):
+    """
+    Pipelined flow: each row's GTM check starts as soon as its own
+    subdomains come back, instead of waiting for the slowest subfinder run.
+    Rows are pulled from `entries` lazily, as the pipeline has room for them.
+    """
+    print("[INFO] Discovering subdomains and GTM IDs (pipelined)...")
+    runner = SubfinderRunner(DISCOVERY_CONCURRENCY)
+    stats = {'new': 0, 'reused': 0}
+
+    async with make_session(stats) as session:
+        async def discover(entry):
+            if entry.website != 'N/A' and not past_deadline():
+                domain = entry.base_domain
+                with RUN_STATS.timed('subfinder'):
+                    raw = await runner.get(domain)
+                entry.found_subdomains = filter_subdomains(domain, raw)
+            combine_subdomains(entry)
+
+        async def scan(entry):
+            await scan_entry(session, entry)
+            checkpoint(entry)
+
+        await run_pipeline(entries, [
+            ('discovery', discover, DISCOVERY_CONCURRENCY),
+            ('dns', resolve_entry, DNS_ROW_CONCURRENCY),
+            ('scan', scan, SCAN_CONCURRENCY),
+        ], describe=lambda entry: entry.website)
+
+    print(f"[INFO] {runner.summary()}")
+    print_scan_summary(stats)
+    print("[INFO] GTM ID discovery complete!\n")
 
-    # Asynchronously discover GTM IDs
-    asyncio.run(main_gtm_processing(domain_dictionary))
-
-    # Merge newly discovered GTM IDs into the original GTM field
-    for idx, entry in domain_dictionary.items():
-        original_ids = list(entry['gtm_ids'])
-        newly_found = entry['discovered_gtm_ids']
-        combined_ids = list(dict.fromkeys(original_ids + newly_found))  # preserve order, remove duplicates
-        
-        # If "No Tag" was present, handle carefully
-        if "No Tag" in combined_ids:
-            combined_ids = [i for i in combined_ids if i != "No Tag"]
-            if not combined_ids:
-                combined_ids = ["No Tag"]
-
-        entry['gtm_ids'] = combined_ids
-
-        df.at[idx, 'Subdomain(s)'] = ', '.join(entry['subdomains'])
-        df.at[idx, 'GTM  ID'] = ', '.join(entry['gtm_ids'])
-
-    df.to_csv('DO_updated.csv', index=False)
+def iter_work_items(path, chunksize=CSV_CHUNK_SIZE):
+    """
+    Stream the sheet chunk by chunk and yield one WorkItem per row.
+    """
+    for chunk in read_sheet_chunks(path, chunksize):
+        columns = zip(
+            chunk.index,
+            text_column(chunk, 'Organization Name'),
+            text_column(chunk, 'Website', 'N/A'),
+            text_column(chunk, 'Subdomain(s)'),
+            text_column(chunk, 'GTM  ID'),
+        )
+        for idx, organization, website, subdomains, gtm_cell in columns:
+            base_domain = 'N/A'
+            if website != 'N/A':
+                base_domain = extract_main_domain(website)
+
+            yield WorkItem(idx, organization, website, base_domain,
+                           split_cell(subdomains), split_cell(gtm_cell))
+
+def merged_gtm_ids(record):
+    """
+    Combine the sheet's GTM IDs with the discovered ones.
+    """
+    original_ids = list(record.gtm_ids)
+    newly_found = list(record.discovered_gtm_ids)
+    combined_ids = list(dict.fromkeys(original_ids + newly_found))  # preserve order, remove duplicates
+
+    # If "No Tag" was present, handle carefully
+    if "No Tag" in combined_ids:
+        combined_ids = [i for i in combined_ids if i != "No Tag"]
+        if not combined_ids:
+            combined_ids = ["No Tag"]
+    return combined_ids
+
+def apply_settings(progress=False, priority=False, deadline=None, confidence=None):
+    """
+    Apply command-line settings to this module (main process or shard worker).
+    """
+    global PRIORITY_SCAN
+    RUN_STATS.progress = progress
+    # A deadline only means something for the priority scheduler
+    PRIORITY_SCAN = priority or deadline is not None
+    SCHEDULER.run_budget = deadline
+    if confidence is not None:
+        SCHEDULER.confidence = confidence
+
+def main(resume=False, workers=1, report_path=RUN_REPORT_PATH, settings=None):
+    # Stream the sheet row by row into the scan instead of loading it whole
+    work_items = iter_work_items('DO.csv')  # For demonstration, you can rename or override as needed
+
+    # With --resume, skip rows the checkpoint journal already has
+    if resume:
+        done = load_results()
+        work_items = (
+            entry for entry in work_items
+            if getattr(done.get(entry.row), 'website', None) != entry.website
+        )
+        print(f"[INFO] Resuming: {len(done)} rows already done")
+
+    # Subdomain discovery + asynchronous GTM discovery
+    flow = pipeline_scan if PIPELINED else discover_then_scan
+    if workers > 1:
+        # Split rows across worker processes by base domain; results meet in the journal
+        run_sharded('GroCSVReader', 'DO.csv', workers, RUN_JOURNAL.path, resume,
+                    stats=RUN_STATS, settings=settings)
+    else:
+        RUN_JOURNAL.start(resume)
+        try:
+            asyncio.run(flow(work_items))
+        finally:
+            RUN_JOURNAL.close()
+            RESPONSE_CACHE.close()
+
+    # Merge from the journal, which also holds rows finished by earlier runs,
+    # one batched column update per chunk of the output
+    results = load_results()
+    updates = {
+        'Subdomain(s)': {row: ', '.join(r.subdomains) for row, r in results.items()},
+        'GTM  ID': {row: ', '.join(merged_gtm_ids(r)) for row, r in results.items()},
+    }
+    write_sheet('DO.csv', 'DO_updated.csv', updates, fill={'Website': 'N/A'})
     print("[INFO] CSV updated and saved to 'DO_updated.csv'\n")
 
+    # Per-stage timings and counters; sharded runs carry each shard's sections
+    if report_path:
+        sections = run_report_sections() if workers <= 1 else {}
+        RUN_STATS.write_report(report_path, workers=workers, **sections)
+
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description='Find GTM IDs for the sites in DO.csv.')
+    parser.add_argument('--resume', action='store_true',
+                        help='Skip rows already recorded in the checkpoint journal')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='Worker processes, each scanning a shard of base domains (default: 1)')
+    parser.add_argument('--report', default=RUN_REPORT_PATH,
+                        help=f"Where to write the JSON run report (default: {RUN_REPORT_PATH})")
+    parser.add_argument('--progress', action='store_true',
+                        help='Show a live progress line on stderr')
+    parser.add_argument('--priority', action='store_true',
+                        help='Scan each row apex/www first and stop once confident (see scanPriority.py)')
+    parser.add_argument('--deadline', type=float, default=None,
+                        help='Seconds for the whole scan; implies --priority. Rows left over wait for --resume')
+    parser.add_argument('--confidence', type=float, default=SCHEDULER.confidence,
+                        help=f"Share of a row's expected value to scan before stopping on a find (default: {SCHEDULER.confidence})")
+    args = parser.parse_args()
+    settings = {'progress': args.progress, 'priority': args.priority,
+                'deadline': args.deadline, 'confidence': args.confidence}
+    apply_settings(**settings)
+    main(resume=args.resume, workers=args.workers, report_path=args.report, settings=settings)
@@ -0,0 +1,1231 @@
+import os
+import re
+import sys
+import glob
+import time
+import socket
+import asyncio
+import argparse
+import tempfile
+import importlib
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from bodyMemo import BodyMemo
+from dnsResolver import DNSCache
+from runStats import RunStats
+from tagDetector import ScanTotals
+from workIndex import WorkIndex
+
+# NOTE: benchmarks import the scrapers directly, so their requirements apply here too
+
+def read_urls(path):
+    """Read one URL per line, skipping blanks and '#' comments."""
+    with open(path, 'r', encoding='utf-8') as f:
+        return [line.strip() for line in f if line.strip() and not line.startswith('#')]
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a non-empty list."""
+    ordered = sorted(values)
+    return ordered[max(0, -(-len(ordered) * pct // 100) - 1)]
+
+def report(label, count, elapsed):
+    rate = count / elapsed * 60 if elapsed else 0.0
+    print(f"{label:<24} {count:>6} URLs in {elapsed:8.2f}s  ->  {rate:8.1f} URLs/min")
+
+def start_server_thread(serve):
+    """
+    Run the aiohttp server started by coroutine `serve` on its own event
+    loop in a daemon thread, so code under test may block its own loop.
+    Returns (loop, whatever `serve` returned).
+    """
+    import threading
+
+    loop = asyncio.new_event_loop()
+    started = loop.run_until_complete(serve)
+    threading.Thread(target=loop.run_forever, daemon=True).start()
+    return loop, started
+
+def stop_server_thread(loop, runner):
+    asyncio.run_coroutine_threadsafe(runner.cleanup(), loop).result()
+    loop.call_soon_threadsafe(loop.stop)
+
+# -------------------------------------------------------------------
+# Selenium: pooled drivers vs. spawn-per-URL
+# -------------------------------------------------------------------
+def bench_selenium_pool(args):
+    import DynamicReader
+
+    urls = read_urls(args.urls)
+    if not urls:
+        print("No URLs to benchmark.")
+        return
+    start_chrome_pool(DynamicReader, size=1).close()
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.workers) as ex:
+        list(ex.map(DynamicReader.extract_gtm_id_selenium, urls))
+    report("spawn-per-URL", len(urls), time.perf_counter() - start)
+
+    pool = DynamicReader.ChromeDriverPool(size=args.workers, max_uses=args.max_uses)
+    try:
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.workers) as ex:
+            list(ex.map(lambda u: DynamicReader.extract_gtm_id_selenium(u, pool), urls))
+        report("pooled drivers", len(urls), time.perf_counter() - start)
+    finally:
+        pool.close()
+
+# -------------------------------------------------------------------
+# Tag detection: single precompiled pass vs. the old per-pattern findall
+# -------------------------------------------------------------------
+LEGACY_PATTERNS = [
+    r'gtm\.js\?id=(GTM-[A-Z0-9\-]{4,})',
+    r'ns\.html\?id=(GTM-[A-Z0-9\-]{4,})',
+    r'GTM-[A-Z0-9\-]{4,}',
+    r'G-[A-Z0-9]{8,12}',
+    r'UA-\d{4,10}-\d{1,4}',
+    r'AW-\d{6,12}',
+    r"fbq\(\s*['\"]init['\"]\s*,\s*['\"](\d{10,20})['\"]",
+]
+
+def legacy_detect(text):
+    found = set()
+    for pattern in LEGACY_PATTERNS:
+        found.update(re.findall(pattern, text, re.IGNORECASE))
+    return found
+
+def bench_detector(args):
+    from tagDetector import detect_tags
+
+    pages = {}
+    for path in sorted(glob.glob(os.path.join(args.fixtures, '*.html'))):
+        with open(path, 'r', encoding='utf-8') as f:
+            pages[os.path.basename(path)] = f.read()
+    if not pages:
+        print(f"No .html fixtures in {args.fixtures}")
+        return
+    total_bytes = sum(len(t.encode('utf-8')) for t in pages.values())
+
+    for label, detect in (("per-pattern findall", legacy_detect), ("single-pass detector", detect_tags)):
+        start = time.perf_counter()
+        for _ in range(args.rounds):
+            for text in pages.values():
+                detect(text)
+        elapsed = time.perf_counter() - start
+        mb = total_bytes * args.rounds / (1024 * 1024)
+        print(f"{label:<24} {len(pages) * args.rounds:>6} pages in {elapsed:8.3f}s  ->  {mb / elapsed:8.1f} MB/s")
+
+    for name, text in pages.items():
+        tags = sorted(detect_tags(text))
+        print(f"  {name}: " + (', '.join(f"{t.kind}={t.id}" for t in tags) or 'no tags'))
+
+# -------------------------------------------------------------------
+# Discovery + scanning: pipelined vs. the two-phase (barrier) flow
+# -------------------------------------------------------------------
+READERS = {'dynamic': 'DynamicReader', 'gro': 'GroCSVReader'}
+
+def run_reader_flow(reader, flow, csv_path):
+    """
+    Run one reader flow against `csv_path` from an empty temporary directory,
+    so neither the subfinder cache nor the HTTP cache carries over.
+    Returns elapsed seconds.
+    """
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        try:
+            work_items = reader.iter_work_items(csv_path)
+            reader.SCAN_STATS = ScanTotals()
+            reader.RUN_STATS = RunStats()
+            reader.WORK_INDEX = WorkIndex()
+            if hasattr(reader, 'BODY_MEMO'):
+                reader.BODY_MEMO = BodyMemo(path=None)
+            reader.DNS_CACHE = DNSCache()
+            if hasattr(reader, 'SEL_FALLBACK_SEMAPHORE'):
+                reader.SEL_FALLBACK_SEMAPHORE = asyncio.Semaphore(reader.SELENIUM_POOL.size)
+            start = time.perf_counter()
+            asyncio.run(flow(work_items))
+            return time.perf_counter() - start
+        finally:
+            reader.RESPONSE_CACHE.close()
+            os.chdir(cwd)
+
+def bench_pipeline(args):
+    reader = importlib.import_module(READERS[args.reader])
+    csv_path = os.path.abspath(args.csv)
+    reader.SCAN_CONCURRENCY = args.scan_workers
+    reader.DISCOVERY_CONCURRENCY = args.discovery_workers
+
+    results = []
+    for label, flow in (("two-phase", reader.discover_then_scan), ("pipelined", reader.pipeline_scan)):
+        elapsed = run_reader_flow(reader, flow, csv_path)
+        results.append((label, elapsed))
+    if hasattr(reader, 'SELENIUM_POOL'):
+        reader.SELENIUM_POOL.close()
+
+    print()
+    for label, elapsed in results:
+        print(f"{label:<24} {elapsed:8.2f}s wall-clock")
+    if results[1][1]:
+        print(f"{'speedup':<24} {results[0][1] / results[1][1]:8.2f}x")
+
+# -------------------------------------------------------------------
+# Sheet ingestion: whole-sheet iterrows()/df.at vs. chunked streaming
+# -------------------------------------------------------------------
+def write_synthetic_sheet(path, rows):
+    """A GTM.csv-shaped sheet: every 10th row already tagged, every 25th without a website."""
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('Organization Name,Website,GTM  ID,Subdomain(s)\n')
+        for i in range(rows):
+            website = '' if i % 25 == 0 else f"site{i}.example.com"
+            gtm = f"GTM-{i:07d}" if i % 10 == 0 else ''
+            f.write(f"Org {i},{website},{gtm},shop.site{i}.example.com\n")
+
+def legacy_ingest(path):
+    """The pre-streaming path: load the whole sheet, build the work list with iterrows()."""
+    import pandas as pd
+    from DynamicReader import extract_main_domain
+
+    df = pd.read_csv(path)
+    df['GTM  ID'] = df['GTM  ID'].fillna('').astype(str)
+    df['Subdomain(s)'] = df['Subdomain(s)'].fillna('').astype(str)
+    df.fillna({"Website": 'N/A'}, inplace=True)
+    work = {}
+    for idx, row in df.iterrows():
+        website = row['Website'].strip()
+        if website == 'N/A' or row['GTM  ID'].strip():
+            continue
+        work[idx] = {
+            'website': website,
+            'base_domain': extract_main_domain(website),
+            'found_subdomains': [],
+            'discovered_gtm_ids': [],
+            'gtm_ids': [],
+            'subdomains': [x.strip() for x in row['Subdomain(s)'].split(',') if x.strip()],
+        }
+    return df, work
+
+def run_legacy(path, out_path):
+    start = time.perf_counter()
+    df, work = legacy_ingest(path)
+    ingested = time.perf_counter() - start
+    for idx in work:
+        df.at[idx, 'GTM  ID'] = 'GTM-BENCH01'
+        df.at[idx, 'Subdomain(s)'] = ''
+    df.to_csv(out_path, index=False)
+    return ingested, ingested, time.perf_counter() - start - ingested
+
+def run_streaming(path, out_path):
+    import DynamicReader
+    from sheetIO import write_sheet
+
+    start = time.perf_counter()
+    first = None
+    rows = []
+    for entry in DynamicReader.iter_work_items(path):
+        if first is None:
+            first = time.perf_counter() - start
+        rows.append(entry.row)    # results are kept per row; entries are not
+    ingested = time.perf_counter() - start
+    write_sheet(path, out_path, {
+        'GTM  ID': dict.fromkeys(rows, 'GTM-BENCH01'),
+        'Subdomain(s)': dict.fromkeys(rows, ''),
+    }, fill={'Website': 'N/A'})
+    return first or ingested, ingested, time.perf_counter() - start - ingested
+
+def bench_ingest(args):
+    print(f"{'rows':>9} {'path':<10} {'first item':>11} {'ingest':>9} {'write-back':>11} {'peak MiB':>9}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for rows in args.rows:
+            path = os.path.join(tmp, f"sheet_{rows}.csv")
+            write_synthetic_sheet(path, rows)
+            for label, fn in (('iterrows', run_legacy), ('streaming', run_streaming)):
+                out_path = os.path.join(tmp, f"out_{label}.csv")
+                # Timings and memory come from separate passes; tracemalloc slows Python down
+                first, ingested, written = fn(path, out_path)
+                tracemalloc.start()
+                fn(path, out_path)
+                peak = tracemalloc.get_traced_memory()[1] / 2**20
+                tracemalloc.stop()
+                print(f"{rows:>9} {label:<10} {first:>10.2f}s {ingested:>8.2f}s "
+                      f"{written:>10.2f}s {peak:>9.1f}")
+
+# -------------------------------------------------------------------
+# Work-item records: per-row dicts vs. the slotted WorkItem / RowResult
+# -------------------------------------------------------------------
+RECORD_ROWS_PER_DOMAIN = 5    # sheet rows sharing one base domain
+RECORD_SHEET_LABELS = ('shop', 'blog', 'events')
+RECORD_FOUND_LABELS = ('shop', 'go', 'careers', 'news')
+RECORD_JOURNAL_FIELDS = ('organization', 'gtm_ids', 'found_subdomains', 'discovered_gtm_ids')
+
+def record_row(i):
+    """Freshly built strings for synthetic row `i`, as the sheet and subfinder would give them."""
+    domain = f"site{i // RECORD_ROWS_PER_DOMAIN}.example.com"
+    return (f"Org {i}", f"www.{domain}",
+            [f"{label}.{domain}" for label in RECORD_SHEET_LABELS],
+            [f"https://{label}.{domain}" for label in RECORD_FOUND_LABELS],
+            [f"GTM-{i // RECORD_ROWS_PER_DOMAIN:07d}"])
+
+def legacy_records(rows):
+    """
+    The old per-row dicts after discovery, combined the old way.
+    Returns (items, item -> journal line, journal line -> result).
+    """
+    import json
+    from GroCSVReader import extract_main_domain
+
+    items = []
+    for i in range(rows):
+        org, website, subs, found, ids = record_row(i)
+        item = {'row': i, 'organization': org, 'website': website,
+                'base_domain': extract_main_domain(website), 'found_subdomains': found,
+                'discovered_gtm_ids': ids, 'gtm_ids': [], 'subdomains': subs}
+        combined = set(item['subdomains']) | set(item['found_subdomains'])
+        item['found_subdomains'] = [s if s.startswith('https://') else f"https://{s}" for s in combined]
+        items.append(item)
+    journal = lambda e: json.dumps({'row': e['row'], 'website': e['website'],
+                                    **{k: e[k] for k in RECORD_JOURNAL_FIELDS}})
+    return items, journal, json.loads
+
+def slotted_records(rows):
+    import json
+    from GroCSVReader import extract_main_domain
+    from workItem import RowResult, WorkItem, merge_subdomains
+
+    items = []
+    for i in range(rows):
+        org, website, subs, found, ids = record_row(i)
+        item = WorkItem(i, org, website, extract_main_domain(website), subs)
+        item.found_subdomains = merge_subdomains(item.subdomains, found)
+        item.discovered_gtm_ids = tuple(ids)
+        items.append(item)
+    journal = lambda e: json.dumps({'row': e.row, 'website': e.website,
+                                    **e.record(RECORD_JOURNAL_FIELDS)})
+    return items, journal, lambda line: RowResult.from_record(json.loads(line))
+
+def merge_records(results, attrs):
+    """The write-back's per-row work: merged IDs and the subdomain column."""
+    get = (lambda r, f: getattr(r, f)) if attrs else (lambda r, f: r.get(f, []))
+    gtm = {row: ', '.join(dict.fromkeys(list(get(r, 'gtm_ids')) + list(get(r, 'discovered_gtm_ids'))))
+           for row, r in results.items()}
+    subs = {row: ', '.join(get(r, 'found_subdomains')) for row, r in results.items()}
+    return gtm, subs
+
+def bench_records(args):
+    import GroCSVReader, workItem    # imported before tracing starts
+    print(f"{'rows':>9} {'records':<9} {'items MiB':>10} {'B/row':>7} {'results MiB':>12} "
+          f"{'merge':>8}")
+    for rows in args.rows:
+        for label, build, attrs in (('dict', legacy_records, False), ('slotted', slotted_records, True)):
+            tracemalloc.start()
+            items, journal, load = build(rows)
+            items_mib = tracemalloc.get_traced_memory()[0] / 2**20
+            lines = [journal(e) for e in items]
+            del items
+            before = tracemalloc.get_traced_memory()[0]
+            results = {i: load(line) for i, line in enumerate(lines)}
+            results_mib = (tracemalloc.get_traced_memory()[0] - before) / 2**20
+            tracemalloc.stop()
+            # Merge timed outside tracemalloc, which slows Python down
+            start = time.perf_counter()
+            merge_records(results, attrs)
+            merged = time.perf_counter() - start
+            del results, lines
+            print(f"{rows:>9} {label:<9} {items_mib:>10.1f} {items_mib * 2**20 / rows:>7.0f} "
+                  f"{results_mib:>12.1f} {merged:>7.2f}s")
+
+# -------------------------------------------------------------------
+# Throttling: plain GETs vs. the adaptive limiter + retries, against a
+# local server that answers 429 once its own token bucket runs dry
+# -------------------------------------------------------------------
+async def serve_rate_limited(port, rate, burst):
+    """Start a local site allowing `rate` requests/s (burst `burst`), else 429 + Retry-After."""
+    from aiohttp import web
+    from rateLimiter import TokenBucket
+
+    bucket = TokenBucket(rate, burst)
+
+    async def page(request):
+        if bucket.take():
+            return web.Response(status=429, headers={'Retry-After': '1'})
+        return web.Response(text='<head><script>GTM-RATE01</script></head>',
+                            content_type='text/html')
+
+    app = web.Application()
+    app.router.add_get('/{path:.*}', page)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, '127.0.0.1', port).start()
+    return runner
+
+async def fetch_all(reader, urls):
+    stats = {'new': 0, 'reused': 0}
+    found = 0
+    async with reader.make_session(stats) as session:
+        results = await asyncio.gather(*(reader.fetch_gtm_ids(session, u) for u in urls))
+    for ids in results:
+        found += bool(ids)
+    return found
+
+def bench_rate_limit(args):
+    import rateLimiter
+    from httpCache import ResponseCache
+
+    reader = importlib.import_module(READERS[args.reader])
+    reader.RESPONSE_CACHE = ResponseCache(path=None)
+    urls = [f"http://127.0.0.1:{args.port}/page{i}" for i in range(args.requests)]
+
+    async def run():
+        server = await serve_rate_limited(args.port, args.server_rate, args.server_burst)
+        try:
+            start = time.perf_counter()
+            found = await fetch_all(reader, urls)
+            return found, time.perf_counter() - start
+        finally:
+            await server.cleanup()
+
+    results = []
+    retry_attempts = rateLimiter.RETRY_ATTEMPTS
+    for label, limited in (("unlimited", False), ("adaptive", True)):
+        reader.RATE_LIMITER = rateLimiter.HostRateLimiter() if limited else None
+        rateLimiter.RETRY_ATTEMPTS = retry_attempts if limited else 0
+        found, elapsed = asyncio.run(run())
+        results.append((label, found, elapsed, reader.RATE_LIMITER))
+    rateLimiter.RETRY_ATTEMPTS = retry_attempts
+
+    print()
+    for label, found, elapsed, limiter in results:
+        print(f"{label:<12} {found:>5}/{len(urls)} pages with a GTM ID  {elapsed:7.2f}s")
+        if limiter:
+            print(f"{'':<12} {limiter.summary()}")
+    print(f"URLs left for the Selenium fallback: "
+          + ', '.join(f"{label} {len(urls) - found}" for label, found, _, _ in results))
+
+# -------------------------------------------------------------------
+# Selenium render profile: full page loads vs. the lean profile
+# -------------------------------------------------------------------
+RENDER_ASSET_SIZES = {    # bytes the fixture server sends per asset type
+    'css': 60_000, 'woff2': 120_000, 'jpg': 400_000, 'png': 250_000,
+    'webp': 200_000, 'svg': 20_000, 'mp4': 2_000_000, 'mp3': 500_000,
+}
+
+def serve_render_fixtures(directory, port):
+    """
+    Serve the pages in `directory` plus generated /assets/* files on a
+    background thread, counting asset bytes sent (in total and per file
+    extension). Returns (server, sent).
+    """
+    import threading
+    from http.server import ThreadingHTTPServer, SimpleHTTPRequestHandler
+
+    sent = {'bytes': 0, 'types': {}}
+    lock = threading.Lock()
+
+    class Handler(SimpleHTTPRequestHandler):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, directory=directory, **kwargs)
+
+        def do_GET(self):
+            if not self.path.startswith('/assets/'):
+                return super().do_GET()
+            ext = self.path.rsplit('.', 1)[-1]
+            body = b'\0' * RENDER_ASSET_SIZES.get(ext, 10_000)
+            self.send_response(200)
+            self.send_header('Content-Type', self.guess_type(self.path))
+            self.send_header('Content-Length', str(len(body)))
+            self.send_header('Cache-Control', 'no-store')
+            self.end_headers()
+            try:
+                self.wfile.write(body)
+            except OSError:
+                return
+            with lock:
+                sent['bytes'] += len(body)
+                sent['types'][ext] = sent['types'].get(ext, 0) + 1
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', port), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, sent
+
+def start_chrome_pool(DynamicReader, **kwargs):
+    """A ChromeDriverPool with its first driver started, or exit if there is no Chrome."""
+    from selenium.common.exceptions import WebDriverException
+
+    pool = DynamicReader.ChromeDriverPool(**kwargs)
+    try:
+        pool.release(pool.acquire())    # start Chrome outside the timings
+    except WebDriverException as e:
+        sys.exit(f"Chrome is not available on this host ({(e.msg or type(e).__name__).strip()})")
+    return pool
+
+def bench_render(args):
+    import statistics
+    import DynamicReader
+
+    server, sent = serve_render_fixtures(os.path.abspath(args.fixtures), args.port)
+    url = f"http://127.0.0.1:{args.port}/{args.page}"
+    print(f"{'profile':<8} {'found':>7} {'median':>8} {'p95':>8} {'asset KiB/page':>15}")
+    try:
+        for label, lean in (("full", False), ("lean", True)):
+            pool = start_chrome_pool(DynamicReader, size=1, lean=lean)
+            times, transferred, found = [], [], 0
+            for _ in range(args.rounds):
+                sent['bytes'] = 0
+                start = time.perf_counter()
+                ids = DynamicReader.extract_gtm_id_selenium(url, pool)
+                times.append(time.perf_counter() - start)
+                transferred.append(sent['bytes'])
+                found += bool(ids)
+            pool.close()
+            print(f"{label:<8} {found:>3}/{args.rounds:<3} {statistics.median(times):7.2f}s "
+                  f"{percentile(times, 95):7.2f}s {statistics.mean(transferred) / 1024:15.0f}")
+    finally:
+        server.shutdown()
+
+def bench_detect_latency(args):
+    import statistics
+    import DynamicReader
+
+    directory = os.path.abspath(args.fixtures)
+    pages = sorted(os.path.basename(p) for p in glob.glob(os.path.join(directory, '*.html')))
+    server, _ = serve_render_fixtures(directory, args.port)
+    pool = start_chrome_pool(DynamicReader, size=1)
+    everything = []
+    print(f"{'page':<28} {'found':>7} {'median':>8} {'p95':>8}")
+    try:
+        for page in pages:
+            url = f"http://127.0.0.1:{args.port}/{page}"
+            times, found = [], 0
+            for _ in range(args.rounds):
+                start = time.perf_counter()
+                found += bool(DynamicReader.extract_gtm_id_selenium(url, pool))
+                times.append(time.perf_counter() - start)
+            everything.extend(times)
+            print(f"{page:<28} {found:>3}/{args.rounds:<3} {statistics.median(times):7.2f}s "
+                  f"{percentile(times, 95):7.2f}s")
+    finally:
+        pool.close()
+        server.shutdown()
+    if everything:
+        print(f"{'all pages':<28} {'':>7} {statistics.median(everything):7.2f}s "
+              f"{percentile(everything, 95):7.2f}s")
+
+def blocked_asset_loads(DynamicReader, pool, url, settle):
+    """
+    Load `url` for `settle` seconds on a pooled driver that has already
+    been reset at least once, the way a Selenium fallback does
+    (Network.enable, then navigate); the fixture server counts the assets.
+    """
+    driver = pool.acquire()
+    try:
+        driver.execute_cdp_cmd("Network.enable", {})
+        driver.execute_cdp_cmd("Page.navigate", {"url": url})
+        time.sleep(settle)
+    finally:
+        pool.release(driver)
+
+def bench_chrome_check(args):
+    """
+    Pass/fail checks of the real Chrome path on the render fixtures: driver
+    reuse across pooled resets, network-event and page-probe detection, and
+    the lean profile's blocked URLs still applying after a reset.
+    """
+    import DynamicReader
+
+    directory = os.path.abspath(args.fixtures)
+    server, sent = serve_render_fixtures(directory, args.port)
+    base = f"http://127.0.0.1:{args.port}"
+    blocked = set(DynamicReader.SEL_BLOCKED_EXTENSIONS)
+    checks = []
+    pools = []
+    try:
+        lean = start_chrome_pool(DynamicReader, size=1, lean=True)
+        full = start_chrome_pool(DynamicReader, size=1, lean=False)
+        pools.extend((lean, full))
+
+        first = lean.acquire()
+        lean.release(first)
+        again = lean.acquire()
+        lean.release(again)
+        checks.append(("pooled driver reused after reset", again is first))
+
+        for page, expected, via in (('delayed_gtm.html', 'GTM-D3LAY20', 'network events'),
+                                    ('first_party_container.html', 'GTM-F1RSTP4', 'page probe'),
+                                    ('heavy_page.html', 'GTM-R3ND3R1', 'network events')):
+            ids = DynamicReader.extract_gtm_id_selenium(f"{base}/{page}", lean, args.timeout)
+            checks.append((f"{page}: {expected} via {via} (got {sorted(ids)})", expected in ids))
+
+        loads = {}
+        for label, pool in (("full", full), ("lean", lean)):
+            sent['types'].clear()
+            blocked_asset_loads(DynamicReader, pool, f"{base}/heavy_page.html", args.settle)
+            loads[label] = sum(n for ext, n in sent['types'].items() if ext in blocked)
+        checks.append((f"full profile fetches blocked asset types ({loads['full']} loads)",
+                       loads['full'] > 0))
+        checks.append((f"lean profile blocks them after a reset ({loads['lean']} loads)",
+                       loads['lean'] == 0))
+    finally:
+        for pool in pools:
+            pool.close()
+        server.shutdown()
+
+    for label, ok in checks:
+        print(f"{'PASS' if ok else 'FAIL'}  {label}")
+    if not all(ok for _, ok in checks):
+        sys.exit(1)
+
+# -------------------------------------------------------------------
+# Sharded runs: throughput at 1, 2, 4, 8... worker processes
+# -------------------------------------------------------------------
+def bench_shards(args):
+    from shardRunner import run_sharded
+
+    reader_name = READERS[args.reader]
+    csv_path = os.path.abspath(args.csv)
+    cwd = os.getcwd()
+    results = []
+    for workers in args.workers:
+        # Fresh directory per run, so no subfinder or HTTP cache carries over
+        with tempfile.TemporaryDirectory() as tmp:
+            os.chdir(tmp)
+            try:
+                start = time.perf_counter()
+                rows = run_sharded(reader_name, csv_path, workers, 'bench.journal.jsonl')
+                results.append((workers, rows, time.perf_counter() - start))
+            finally:
+                os.chdir(cwd)
+
+    print(f"\n{'workers':>7} {'rows':>7} {'elapsed':>9} {'rows/min':>10} {'speedup':>8}")
+    base = results[0][2]
+    for workers, rows, elapsed in results:
+        rate = rows / elapsed * 60 if elapsed else 0.0
+        print(f"{workers:>7} {rows:>7} {elapsed:8.2f}s {rate:10.1f} {base / elapsed:7.2f}x")
+    print(f"(this machine has {os.cpu_count()} CPUs)")
+
+# -------------------------------------------------------------------
+# Offline end-to-end runs: both readers and the subdomain validator
+# against a local HTTPS fixture site mix, with a fake `subfinder`
+# -------------------------------------------------------------------
+OFFLINE_MIX = {          # default share of synthetic sites per behaviour
+    'static': 30,        # inline GTM snippet
+    'js': 15,            # ID only built at runtime by a first-party script
+    'redirect': 10,      # '/' redirects through gtm.js?id=
+    'slow': 10,          # answers after OFFLINE_SLOW_DELAY
+    'huge': 5,           # OFFLINE_HUGE_BYTES of markup, snippet near the end
+    'parked': 10,        # the same tagless parking page on every site
+    'dead': 15,          # NXDOMAIN
+    'throttled': 15,     # 429 + Retry-After for the first OFFLINE_THROTTLE_COUNT requests
+}
+OFFLINE_SLOW_DELAY = 1.5                 # seconds
+OFFLINE_HUGE_BYTES = 4 * 1024 * 1024     # stays under the scanner's byte cap
+OFFLINE_THROTTLE_COUNT = 2               # 429s per host before it answers
+OFFLINE_TLS_CERT = os.path.join('fixtures', 'bench', 'localhost.pem')
+OFFLINE_TARGETS = ('dynamic', 'gro', 'validator')
+
+GTM_SNIPPET = (
+    "<script>(function(w,d,s,l,i){w[l]=w[l]||[];w[l].push({'gtm.start':new Date().getTime(),"
+    "event:'gtm.js'});var f=d.getElementsByTagName(s)[0],j=d.createElement(s),"
+    "dl=l!='dataLayer'?'&l='+l:'';j.async=true;"
+    "j.src='https://www.googletagmanager.com/gtm.js?id='+i+dl;f.parentNode.insertBefore(j,f);"
+    "})(window,document,'script','dataLayer',%s);</script>"
+)
+
+def offline_label(host):
+    """'shop.static-0007.test' -> 'static-0007'"""
+    parts = host.lower().split('.')
+    return parts[-2] if len(parts) >= 2 else parts[0]
+
+def offline_gtm_id(label):
+    kind, _, number = label.partition('-')
+    return f"GTM-{kind[:2].upper()}{number}"
+
+def offline_sites(rows, mix):
+    """Deterministic list of `rows` fixture domains drawn from `mix`."""
+    import random
+
+    kinds = random.Random(0).choices(list(mix), weights=list(mix.values()), k=rows)
+    return [f"{kind}-{i:04d}.test" for i, kind in enumerate(kinds)]
+
+async def offline_resolve(host):
+    """DNS stub: fixture hosts are 127.0.0.1, 'dead' sites and everything else NXDOMAIN."""
+    if not host.endswith('.test') or offline_label(host).startswith('dead-'):
+        return []
+    return [(socket.AF_INET, '127.0.0.1')]
+
+def offline_aiohttp_resolver(dns_cache, port):
+    """The readers' cached resolver, sending every connection to the fixture server's port."""
+    from dnsResolver import make_aiohttp_resolver
+
+    resolver = make_aiohttp_resolver(dns_cache)
+    resolve = resolver.resolve
+
+    async def to_fixture_port(host, _port=0, family=socket.AF_INET):
+        return [dict(r, port=port) for r in await resolve(host, port, family)]
+
+    resolver.resolve = to_fixture_port
+    return resolver
+
+async def serve_offline_sites(port, cert):
+    """
+    Start the HTTPS fixture server; each request behaves according to its
+    Host's site kind. Returns (runner, hits); clear `hits` to reset the
+    per-host throttling between runs.
+    """
+    import ssl
+    from collections import defaultdict
+    from aiohttp import web
+
+    ssl_context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+    ssl_context.load_cert_chain(cert)
+    hits = defaultdict(int)
+    filler = '<p>' + 'lorem ipsum dolor sit amet ' * 40 + '</p>\n'
+    huge_body = filler * (OFFLINE_HUGE_BYTES // len(filler))
+
+    async def page(request):
+        host = request.host.split(':')[0]
+        label = offline_label(host)
+        kind = label.split('-')[0]
+        gtm_id = offline_gtm_id(label)
+        hits[host] += 1
+        if kind == 'throttled' and hits[host] <= OFFLINE_THROTTLE_COUNT:
+            return web.Response(status=429, headers={'Retry-After': '1'})
+        if kind == 'slow':
+            await asyncio.sleep(OFFLINE_SLOW_DELAY)
+        if request.path == '/gtm.js':
+            return web.Response(text='/* container */', content_type='application/javascript')
+        if request.path == '/app.js':
+            js = f"var c = ['GTM', '{gtm_id[4:]}'].join('-');\n" + GTM_SNIPPET[8:-9] % 'c'
+            return web.Response(text=js, content_type='application/javascript')
+        if kind == 'redirect':
+            raise web.HTTPFound(f"/gtm.js?id={gtm_id}")
+        if kind == 'parked':
+            return web.Response(text='<html><head><title>Parked</title></head>'
+                                     '<body>This domain is parked.</body></html>',
+                                content_type='text/html')
+        if kind == 'js':
+            return web.Response(text='<html><head><script src="/app.js"></script></head>'
+                                     '<body>app</body></html>', content_type='text/html')
+        snippet = GTM_SNIPPET % f"'{gtm_id}'"
+        body = huge_body + snippet if kind == 'huge' else snippet + filler
+        return web.Response(text=f"<html><head></head><body>{body}</body></html>",
+                            content_type='text/html')
+
+    app = web.Application()
+    app.router.add_route('*', '/{path:.*}', page)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, '127.0.0.1', port, ssl_context=ssl_context).start()
+    return runner, hits
+
+def write_fake_subfinder(directory, delay):
+    """A `subfinder` stand-in that answers www.<domain> and shop.<domain> after `delay` seconds."""
+    path = os.path.join(directory, 'subfinder')
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(f"#!{sys.executable}\n"
+                "import sys, time\n"
+                f"time.sleep({delay})\n"
+                "domain = sys.argv[sys.argv.index('-d') + 1]\n"
+                "print(f'www.{domain}')\n"
+                "print(f'shop.{domain}')\n")
+    os.chmod(path, 0o755)
+
+def write_offline_sheets(directory, sites):
+    """Reader sheet (GTM.csv/DO.csv columns) and validator sheet for `sites`."""
+    import csv
+
+    reader_sheet = os.path.join(directory, 'sites.csv')
+    with open(reader_sheet, 'w', encoding='utf-8', newline='') as f:
+        w = csv.writer(f)
+        w.writerow(['Organization Name', 'Website', 'Subdomain(s)', 'GTM  ID'])
+        for i, domain in enumerate(sites):
+            w.writerow([f"Org {i}", f"https://www.{domain}", '', ''])
+    validator_sheet = os.path.join(directory, 'subdomains.csv')
+    with open(validator_sheet, 'w', encoding='utf-8', newline='') as f:
+        w = csv.writer(f)
+        w.writerow(['Organization Name', 'Subdomain(s)'])
+        for i, domain in enumerate(sites):
+            w.writerow([f"Org {i}", f"shop.{domain}"])
+    return reader_sheet, validator_sheet
+
+def peak_rss_mb():
+    """This process's peak resident set size in MiB (None where `resource` is missing)."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024 if sys.platform == 'darwin' else 1024)
+
+def run_offline_target(target, sheet, port, workdir, pipelined):
+    """
+    Worker process: one end-to-end run of `target` from `workdir`.
+    Returns its measurements as a dict.
+    """
+    os.chdir(workdir)
+    latencies = []
+
+    if target == 'validator':
+        import subdomainValidator
+
+        subdomainValidator.DNSCache = lambda concurrency: DNSCache(
+            concurrency=concurrency, resolve=offline_resolve)
+        connect = subdomainValidator.try_connect
+
+        async def timed_connect(domain, _port, timeout):
+            start = time.perf_counter()
+            try:
+                return await connect(domain, port, timeout)
+            finally:
+                latencies.append(time.perf_counter() - start)
+
+        subdomainValidator.try_connect = timed_connect
+        start = time.perf_counter()
+        subdomainValidator.process_csv(sheet, 'validated.csv')
+        elapsed = time.perf_counter() - start
+        with open(sheet, 'r', encoding='utf-8') as f:
+            rows = sum(1 for _ in f) - 1
+        found, counters = None, {}
+    else:
+        from httpCache import ResponseCache
+        from rateLimiter import HostRateLimiter
+        from runJournal import RunJournal
+
+        reader = importlib.import_module(READERS[target])
+        reader.DNS_CACHE = DNSCache(resolve=offline_resolve)
+        reader.make_aiohttp_resolver = lambda cache: offline_aiohttp_resolver(cache, port)
+        reader.HTTP_VERIFY_SSL = False
+        reader.RESPONSE_CACHE = ResponseCache(path=None)
+        # Every fixture host is 127.0.0.1, so only the per-host buckets apply
+        reader.RATE_LIMITER = HostRateLimiter()
+        reader.RUN_JOURNAL = RunJournal('offline.journal.jsonl')
+        if hasattr(reader, 'extract_gtm_id_selenium'):
+            # Chrome can't reach the fixture hosts: escalations are counted, not rendered
+            reader.extract_gtm_id_selenium = lambda url, pool=None, timeout=None, raise_errors=False: []
+        fetch = reader.fetch_gtm_ids
+
+        async def timed_fetch(session, url):
+            start = time.perf_counter()
+            try:
+                return await fetch(session, url)
+            finally:
+                latencies.append(time.perf_counter() - start)
+
+        reader.fetch_gtm_ids = timed_fetch
+        flow = reader.pipeline_scan if pipelined else reader.discover_then_scan
+        reader.RUN_JOURNAL.start()
+        start = time.perf_counter()
+        try:
+            asyncio.run(flow(reader.iter_work_items(sheet)))
+        finally:
+            reader.RUN_JOURNAL.close()
+        elapsed = time.perf_counter() - start
+        results = reader.RUN_JOURNAL.load()
+        rows = len(results)
+        found = sum(1 for r in results.values() if r['discovered_gtm_ids'])
+        counters = dict(reader.RUN_STATS.counters)
+
+    return {
+        'target': target,
+        'rows': rows,
+        'urls': len(latencies),
+        'found': found,
+        'elapsed': elapsed,
+        'rows_per_min': rows / elapsed * 60 if elapsed else 0.0,
+        'p50': percentile(latencies, 50) if latencies else None,
+        'p95': percentile(latencies, 95) if latencies else None,
+        'max': max(latencies) if latencies else None,
+        'peak_rss_mb': peak_rss_mb(),
+        'counters': counters,
+    }
+
+def parse_mix(text):
+    """'static=30,js=15,...' -> {'static': 30, 'js': 15, ...}; unknown kinds are an error."""
+    mix = {}
+    for part in filter(None, (p.strip() for p in text.split(','))):
+        kind, _, weight = part.partition('=')
+        if kind not in OFFLINE_MIX:
+            raise SystemExit(f"Unknown site kind '{kind}' (choose from {', '.join(OFFLINE_MIX)})")
+        mix[kind] = float(weight)
+    return mix
+
+def _fmt(value, width, spec, suffix=''):
+    return f"{'-':>{width}}" if value is None else f"{value:>{width - len(suffix)}{spec}}{suffix}"
+
+def print_offline_results(results, baseline=None):
+    print(f"\n{'target':<10} {'rows':>5} {'URLs':>5} {'found':>6} {'elapsed':>9} "
+          f"{'rows/min':>9} {'p50':>7} {'p95':>7} {'max':>7} {'peak RSS':>10}")
+    for r in results:
+        print(f"{r['target']:<10} {r['rows']:>5} {r['urls']:>5} {_fmt(r['found'], 6, 'd')} "
+              f"{r['elapsed']:8.2f}s {r['rows_per_min']:9.1f} {_fmt(r['p50'], 7, '.2f', 's')} "
+              f"{_fmt(r['p95'], 7, '.2f', 's')} {_fmt(r['max'], 7, '.2f', 's')} "
+              f"{_fmt(r['peak_rss_mb'], 10, '.1f', ' MiB')}")
+        tiers = r['counters']
+        if 'chrome' in tiers or 'js' in tiers or 'http' in tiers:
+            print(f"{'':<10} pages {tiers['pages']}, plain HTTP {tiers.get('http', 0)}, "
+                  f"static JS {tiers.get('js', 0)}, Chrome escalations {tiers.get('chrome', 0)}")
+    if not baseline:
+        return
+
+    print(f"\nAgainst the baseline from {baseline['saved_at']}:")
+    before = {r['target']: r for r in baseline['results']}
+    for r in results:
+        old = before.get(r['target'])
+        if not old:
+            continue
+        changes = []
+        for key, label in (('elapsed', 'elapsed'), ('rows_per_min', 'rows/min'),
+                           ('p95', 'p95'), ('peak_rss_mb', 'peak RSS')):
+            if r[key] is not None and old.get(key):
+                changes.append(f"{label} {(r[key] - old[key]) / old[key] * 100:+.0f}%")
+        print(f"  {r['target']:<10} " + ', '.join(changes))
+
+def bench_offline(args):
+    import json
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+
+    mix = parse_mix(args.mix) if args.mix else dict(OFFLINE_MIX)
+    params = {'rows': args.rows, 'mix': mix, 'pipelined': args.pipelined,
+              'subfinder_delay': args.subfinder_delay}
+    sites = offline_sites(args.rows, mix)
+
+    baseline = None
+    if not args.save_baseline and os.path.exists(args.baseline):
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        if baseline.get('params') != params:
+            print(f"[WARN] {args.baseline} was saved with different settings: {baseline.get('params')}")
+
+    loop, (server, hits) = start_server_thread(
+        serve_offline_sites(args.port, os.path.abspath(args.cert)))
+    results = []
+    path = os.environ.get('PATH', '')
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            write_fake_subfinder(tmp, args.subfinder_delay)
+            os.environ['PATH'] = tmp + os.pathsep + path
+            reader_sheet, validator_sheet = write_offline_sheets(tmp, sites)
+            context = multiprocessing.get_context('spawn')
+            for target in args.targets:
+                # A fresh process per target: clean module state and its own peak RSS
+                workdir = os.path.join(tmp, target)
+                os.mkdir(workdir)
+                sheet = validator_sheet if target == 'validator' else reader_sheet
+                print(f"[INFO] Running {target} over {len(sites)} fixture sites...")
+                loop.call_soon_threadsafe(hits.clear)
+                with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+                    results.append(pool.submit(run_offline_target, target, sheet, args.port,
+                                               workdir, args.pipelined).result())
+    finally:
+        os.environ['PATH'] = path
+        stop_server_thread(loop, server)
+
+    print_offline_results(results, baseline)
+    if args.save_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump({'saved_at': time.strftime('%Y-%m-%d %H:%M:%S'), 'params': params,
+                       'results': results}, f, indent=2)
+        print(f"\n[INFO] Baseline saved to '{args.baseline}'")
+
+# -------------------------------------------------------------------
+# Event-loop lag while HTML-regex fallbacks run: the old blocking
+# requests.get() against the async fallback on the shared session
+# -------------------------------------------------------------------
+LAG_TICK = 0.01    # seconds the lag monitor sleeps between checks
+
+async def serve_slow_pages(port, delay):
+    """Start a local site answering every page (no GTM ID) after `delay` seconds."""
+    from aiohttp import web
+
+    async def page(request):
+        await asyncio.sleep(delay)
+        return web.Response(text='<html><head></head><body>no tags here</body></html>',
+                            content_type='text/html')
+
+    app = web.Application()
+    app.router.add_get('/{path:.*}', page)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, '127.0.0.1', port).start()
+    return runner
+
+def legacy_fetch_gtm_ids_from_html(url):
+    """The old fallback: a blocking requests.get() called from inside a coroutine."""
+    import requests
+    from tagDetector import detect_gtm_ids
+
+    try:
+        r = requests.get(url, headers={'User-Agent': 'Mozilla/5.0'}, timeout=10)
+        return detect_gtm_ids(r.text)
+    except Exception:
+        return []
+
+async def measure_loop_lag(work):
+    """
+    Await `work` while a monitor coroutine sleeps LAG_TICK at a time and
+    records how late each wake-up is. Returns (elapsed, lags).
+    """
+    lags = []
+    done = asyncio.Event()
+
+    async def monitor():
+        while not done.is_set():
+            start = time.perf_counter()
+            await asyncio.sleep(LAG_TICK)
+            lags.append(time.perf_counter() - start - LAG_TICK)
+
+    watcher = asyncio.ensure_future(monitor())
+    await asyncio.sleep(0)
+    start = time.perf_counter()
+    try:
+        await work
+    finally:
+        elapsed = time.perf_counter() - start
+        done.set()
+        await watcher
+    return elapsed, lags
+
+def bench_loop_lag(args):
+    import aiohttp
+    import DynamicReader
+
+    DynamicReader.RATE_LIMITER = None
+    urls = [f"http://127.0.0.1:{args.port}/page{i}" for i in range(args.fallbacks)]
+    loop, server = start_server_thread(serve_slow_pages(args.port, args.delay))
+
+    async def legacy():
+        async def one(url):
+            return legacy_fetch_gtm_ids_from_html(url)
+        await asyncio.gather(*(one(u) for u in urls))
+
+    async def fetch_async():
+        async with aiohttp.ClientSession() as session:
+            await asyncio.gather(*(DynamicReader.fetch_gtm_ids_from_html(session, u) for u in urls))
+
+    print(f"{len(urls)} concurrent fallbacks, server answers after {args.delay}s\n")
+    print(f"{'fallback':<22} {'elapsed':>9} {'max lag':>9} {'p99 lag':>9}")
+    try:
+        for label, work in (("blocking requests", legacy), ("async refetch", fetch_async)):
+            elapsed, lags = asyncio.run(measure_loop_lag(work()))
+            lags = lags or [0.0]
+            print(f"{label:<22} {elapsed:8.2f}s {max(lags):8.3f}s {percentile(lags, 99):8.3f}s")
+    finally:
+        stop_server_thread(loop, server)
+
+# -------------------------------------------------------------------
+# Priority scheduling: every URL of a row vs. apex/www first with early
+# stopping, both under the same run deadline
+# -------------------------------------------------------------------
+PRIORITY_OTHER_LABELS = ('api', 'dev', 'staging', 'cdn', 'mail', 'status', 'docs', 'assets')
+PRIORITY_SHOP_ONLY_EVERY = 5    # every Nth site has its container on shop.* only
+
+def priority_rows(rows):
+    """[(base_domain, subdomain URLs)]: www, shop and PRIORITY_OTHER_LABELS per site."""
+    out = []
+    for i in range(rows):
+        domain = f"site-{i:04d}.test"
+        labels = ('www', 'shop') + PRIORITY_OTHER_LABELS
+        out.append((domain, [f"https://{label}.{domain}" for label in labels]))
+    return out
+
+async def serve_priority_sites(port, cert, delay):
+    """
+    Start the HTTPS fixture server for priority_rows(): apex, www and shop
+    pages carry the site's GTM ID at once (shop only, on every
+    PRIORITY_SHOP_ONLY_EVERY-th site); other subdomains answer a tagless
+    page after `delay` seconds.
+    """
+    import ssl
+    from aiohttp import web
+
+    ssl_context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+    ssl_context.load_cert_chain(cert)
+
+    async def page(request):
+        host = request.host.split(':')[0].lower()
+        label = host.split('.')[0] if host.count('.') > 1 else ''
+        number = int(offline_label(host).split('-')[1])
+        shop_only = number % PRIORITY_SHOP_ONLY_EVERY == PRIORITY_SHOP_ONLY_EVERY - 1
+        if label == 'shop' or (label in ('', 'www') and not shop_only):
+            body = GTM_SNIPPET % f"'GTM-PR{number:04d}'"
+        else:
+            await asyncio.sleep(delay)
+            body = '<p>internal</p>'
+        return web.Response(text=f"<html><head></head><body>{body}</body></html>",
+                            content_type='text/html')
+
+    app = web.Application()
+    app.router.add_route('*', '/{path:.*}', page)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, '127.0.0.1', port, ssl_context=ssl_context).start()
+    return runner
+
+def bench_priority(args):
+    from httpCache import ResponseCache
+    from rateLimiter import HostRateLimiter
+    from scanPriority import PriorityScheduler
+
+    reader = importlib.import_module(READERS[args.reader])
+    reader.make_aiohttp_resolver = lambda cache: offline_aiohttp_resolver(cache, args.port)
+    reader.HTTP_VERIFY_SSL = False
+    if hasattr(reader, 'extract_gtm_id_selenium'):
+        # Chrome can't reach the fixture hosts: escalations are counted, not rendered
+        reader.extract_gtm_id_selenium = lambda url, pool=None, timeout=None, raise_errors=False: []
+    rows = priority_rows(args.rows)
+
+    async def run(priority):
+        reader.PRIORITY_SCAN = priority
+        reader.SCHEDULER = PriorityScheduler(run_budget=args.deadline, confidence=args.confidence)
+        reader.DNS_CACHE = DNSCache(resolve=offline_resolve)
+        reader.RESPONSE_CACHE = ResponseCache(path=None)
+        reader.RATE_LIMITER = HostRateLimiter()
+        reader.RUN_STATS = RunStats()
+        reader.WORK_INDEX = WorkIndex()
+        if hasattr(reader, 'BODY_MEMO'):
+            reader.BODY_MEMO = BodyMemo(path=None)
+        server = await serve_priority_sites(args.port, os.path.abspath(args.cert), args.delay)
+        sem = asyncio.Semaphore(reader.SCAN_CONCURRENCY)
+        found = []
+        try:
+            async with reader.make_session({'new': 0, 'reused': 0}) as session:
+                async def scan(domain, subs):
+                    async with sem:
+                        if reader.past_deadline():
+                            return
+                        ids = await reader.process_domain_gtm(session, domain, subs)
+                    if ids:
+                        found.append(time.perf_counter() - start)
+
+                start = time.perf_counter()
+                tasks = [asyncio.ensure_future(scan(d, s)) for d, s in rows]
+                await asyncio.wait(tasks, timeout=args.deadline)
+                elapsed = time.perf_counter() - start
+                for task in tasks:
+                    task.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
+        finally:
+            await server.cleanup()
+        return found, elapsed, dict(reader.WORK_INDEX.stats)
+
+    print(f"{len(rows)} rows x {len(rows[0][1]) + 1} URLs, slow subdomains take {args.delay}s, "
+          f"deadline {args.deadline}s\n")
+    print(f"{'scan order':<16} {'rows w/ ID':>10} {'fetched':>8} {'elapsed':>9} {'IDs/min':>9} {'1st half':>9}")
+    for label, priority in (("every URL", False), ("priority", True)):
+        found, elapsed, work = asyncio.run(run(priority))
+        rate = len(found) / elapsed * 60 if elapsed else 0.0
+        early = sum(1 for t in found if t <= elapsed / 2)
+        print(f"{label:<16} {len(found):>10} {work['fetches']:>8} {elapsed:8.2f}s {rate:9.1f} {early:>9}")
+    print(f"\n(sites with the ID on shop.* only: every {PRIORITY_SHOP_ONLY_EVERY}th)")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Performance benchmarks for the GTM scrapers.')
+    sub = parser.add_subparsers(dest='bench', required=True)
+
+    p = sub.add_parser('selenium-pool', help='Compare pooled Chrome drivers against spawn-per-URL')
+    p.add_argument('urls', help='Text file with one URL per line')
+    p.add_argument('--workers', type=int, default=3, help='Concurrent Selenium sessions (default: 3)')
+    p.add_argument('--max-uses', type=int, default=50, help='Checks per pooled driver before recycling')
+    p.set_defaults(func=bench_selenium_pool)
+
+    p = sub.add_parser('detector', help='Micro-benchmark the tag detector on saved HTML fixtures')
+    p.add_argument('--fixtures', default=os.path.join('fixtures', 'html'),
+                   help='Directory of .html fixtures (default: fixtures/html)')
+    p.add_argument('--rounds', type=int, default=200, help='Passes over the corpus (default: 200)')
+    p.set_defaults(func=bench_detector)
+
+    p = sub.add_parser('pipeline', help='Compare pipelined discovery+scan against the two-phase flow')
+    p.add_argument('csv', help='Input sheet (same columns as GTM.csv / DO.csv)')
+    p.add_argument('--reader', choices=sorted(READERS), default='gro', help='Which reader to drive (default: gro)')
+    p.add_argument('--scan-workers', type=int, default=10, help='Rows scanned at once (default: 10)')
+    p.add_argument('--discovery-workers', type=int, default=10, help='Rows in subfinder at once (default: 10)')
+    p.set_defaults(func=bench_pipeline)
+
+    p = sub.add_parser('ingest', help='Compare iterrows()/df.at sheet handling against chunked streaming')
+    p.add_argument('--rows', type=int, nargs='+', default=[10_000, 100_000, 1_000_000],
+                   help='Synthetic sheet sizes (default: 10000 100000 1000000)')
+    p.set_defaults(func=bench_ingest)
+
+    p = sub.add_parser('rate-limit', help='Compare plain GETs against adaptive rate limiting on a throttling server')
+    p.add_argument('--reader', choices=sorted(READERS), default='gro', help='Which reader to drive (default: gro)')
+    p.add_argument('--requests', type=int, default=200, help='Distinct URLs fetched (default: 200)')
+    p.add_argument('--server-rate', type=float, default=20, help='Requests/s the server allows (default: 20)')
+    p.add_argument('--server-burst', type=int, default=10, help='Burst the server allows (default: 10)')
+    p.add_argument('--port', type=int, default=8765, help='Local port for the test server (default: 8765)')
+    p.set_defaults(func=bench_rate_limit)
+
+    p = sub.add_parser('render', help='Compare the full and lean Selenium render profiles on a heavy page')
+    p.add_argument('--fixtures', default=os.path.join('fixtures', 'render'),
+                   help='Directory of pages to serve (default: fixtures/render)')
+    p.add_argument('--page', default='heavy_page.html', help='Page to load (default: heavy_page.html)')
+    p.add_argument('--rounds', type=int, default=10, help='Page loads per profile (default: 10)')
+    p.add_argument('--port', type=int, default=8766, help='Local port for the fixture server (default: 8766)')
+    p.set_defaults(func=bench_render)
+
+    p = sub.add_parser('detect-latency', help='Median/p95 Selenium GTM detection latency on local fixture pages')
+    p.add_argument('--fixtures', default=os.path.join('fixtures', 'render'),
+                   help='Directory of pages to serve (default: fixtures/render)')
+    p.add_argument('--rounds', type=int, default=20, help='Loads per page (default: 20)')
+    p.add_argument('--port', type=int, default=8766, help='Local port for the fixture server (default: 8766)')
+    p.set_defaults(func=bench_detect_latency)
+
+    p = sub.add_parser('chrome-check', help='Pass/fail checks of the pooled Chrome path on local fixture pages')
+    p.add_argument('--fixtures', default=os.path.join('fixtures', 'render'),
+                   help='Directory of pages to serve (default: fixtures/render)')
+    p.add_argument('--timeout', type=float, default=10, help='Seconds each detection may take (default: 10)')
+    p.add_argument('--settle', type=float, default=2, help='Seconds a page loads for the blocking check (default: 2)')
+    p.add_argument('--port', type=int, default=8766, help='Local port for the fixture server (default: 8766)')
+    p.set_defaults(func=bench_chrome_check)
+
+    p = sub.add_parser('shards', help='Throughput of the sharded multi-process runner at several worker counts')
+    p.add_argument('csv', help='Input sheet (same columns as GTM.csv / DO.csv)')
+    p.add_argument('--reader', choices=sorted(READERS), default='dynamic', help='Which reader to drive (default: dynamic)')
+    p.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, 8],
+                   help='Worker counts to compare (default: 1 2 4 8)')
+    p.set_defaults(func=bench_shards)
+
+    p = sub.add_parser('offline', help='End-to-end readers and subdomain validator against local fixture sites')
+    p.add_argument('--rows', type=int, default=60, help='Synthetic sites in the sheet (default: 60)')
+    p.add_argument('--mix', help='Site kind weights, e.g. static=30,js=15,dead=15 (default: '
+                   + ','.join(f"{k}={v}" for k, v in OFFLINE_MIX.items()) + ')')
+    p.add_argument('--targets', nargs='+', choices=OFFLINE_TARGETS, default=list(OFFLINE_TARGETS),
+                   help='What to run (default: all)')
+    p.add_argument('--pipelined', action='store_true',
+                   help='Drive pipeline_scan instead of discovery followed by main_gtm_processing')
+    p.add_argument('--subfinder-delay', type=float, default=0.2,
+                   help='Seconds the fake subfinder takes per domain (default: 0.2)')
+    p.add_argument('--baseline', default='bench_baseline.json',
+                   help='Baseline file compared against, if present (default: bench_baseline.json)')
+    p.add_argument('--save-baseline', action='store_true', help='Save this run as the baseline')
+    p.add_argument('--cert', default=OFFLINE_TLS_CERT,
+                   help=f'Certificate + key for the fixture server (default: {OFFLINE_TLS_CERT})')
+    p.add_argument('--port', type=int, default=8767, help='Local port for the fixture server (default: 8767)')
+    p.set_defaults(func=bench_offline)
+
+    p = sub.add_parser('loop-lag', help='Event-loop lag while HTML-regex fallbacks run: blocking vs. async')
+    p.add_argument('--fallbacks', type=int, default=20, help='Fallbacks started at once (default: 20)')
+    p.add_argument('--delay', type=float, default=0.5, help='Seconds the local server takes per page (default: 0.5)')
+    p.add_argument('--port', type=int, default=8768, help='Local port for the test server (default: 8768)')
+    p.set_defaults(func=bench_loop_lag)
+
+    p = sub.add_parser('priority', help='IDs found per minute under a deadline: every URL vs. priority order')
+    p.add_argument('--reader', choices=sorted(READERS), default='gro', help='Which reader to drive (default: gro)')
+    p.add_argument('--rows', type=int, default=100, help='Synthetic sites (default: 100)')
+    p.add_argument('--delay', type=float, default=2.0, help='Seconds slow subdomains take (default: 2.0)')
+    p.add_argument('--deadline', type=float, default=20.0, help='Seconds for the whole run (default: 20)')
+    p.add_argument('--confidence', type=float, default=0.5, help='Scheduler confidence (default: 0.5)')
+    p.add_argument('--cert', default=OFFLINE_TLS_CERT,
+                   help=f"PEM with the fixture server's certificate and key (default: {OFFLINE_TLS_CERT})")
+    p.add_argument('--port', type=int, default=8769, help='Local port for the fixture server (default: 8769)')
+    p.set_defaults(func=bench_priority)
+
+    p = sub.add_parser('records', help='Memory (tracemalloc) and merge time: per-row dicts vs. slotted records')
+    p.add_argument('--rows', type=int, nargs='+', default=[100_000],
+                   help='Row counts to build (default: 100000)')
+    p.set_defaults(func=bench_records)
+
+    args = parser.parse_args()
+    args.func(args)
@@ -0,0 +1,150 @@
+import os
+import re
+import json
+import asyncio
+import hashlib
+from collections import OrderedDict
+
+# NOTE: used by DynamicReader.py to skip the fallback tiers on repeated page bodies; standard library only
+
+# -------------------------------------------------------------------
+# Content-hash memo: one fallback verdict per distinct page body
+# -------------------------------------------------------------------
+BODY_MEMO_MAX_ENTRIES = 10_000    # distinct bodies remembered (least recently used go first)
+BODY_MEMO_PATH = None             # e.g. 'body_memo.json' to keep the memo across runs
+
+WHITESPACE_PATTERN = re.compile(r'\s+')
+
+def body_key(text, scope=''):
+    """
+    Fast 128-bit hash of a page body with runs of whitespace collapsed. A
+    `scope` (e.g. the site) makes identical bodies from different scopes
+    distinct, for pages whose result depends on more than the body itself.
+    """
+    normalized = WHITESPACE_PATTERN.sub(' ', text).strip()
+    digest = hashlib.blake2b(scope.encode('utf-8'), digest_size=16)
+    digest.update(b'\0' + normalized.encode('utf-8', 'replace'))
+    return digest.hexdigest()
+
+class BodyMemo:
+    """
+    Bounded LRU of page-body hash -> {'ids', 'rendered', 'rendered_found_more'}:
+    the GTM IDs every tier together found for that body, whether Chrome was
+    run on it, and whether Chrome found IDs the static tiers missed. Parked
+    pages, CDN error pages and shared landing pages are then resolved once
+    instead of once per subdomain; copies arriving while the first is still
+    being resolved wait for it. IDs only Chrome found are reused within the
+    site that produced them, not across sites. With `path` the memo is
+    loaded on first use and saved by close().
+    """
+
+    def __init__(self, path=BODY_MEMO_PATH, max_entries=BODY_MEMO_MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self._entries = None
+        self._inflight = {}
+        self._waiters = {}
+        self.stats = {'hits': 0, 'misses': 0, 'chrome_skipped': 0}
+
+    def _memo(self):
+        if self._entries is None:
+            self._entries = OrderedDict()
+            if self.path and os.path.exists(self.path):
+                try:
+                    with open(self.path, 'r', encoding='utf-8') as f:
+                        self._entries.update(json.load(f))
+                except (OSError, ValueError):
+                    pass
+        return self._entries
+
+    def lookup(self, key):
+        """The memo entry for body hash `key`, or None."""
+        entries = self._memo()
+        entry = entries.get(key)
+        if entry is not None:
+            entries.move_to_end(key)
+        return entry
+
+    async def _settled(self, key):
+        """The entry for `key`, waiting for one still being resolved; None if absent."""
+        entry = self.lookup(key)
+        task = self._inflight.get(key)
+        if entry is None and task is not None:
+            entry = await self._wait(key, task)
+        return entry
+
+    async def _wait(self, key, task):
+        """Await `task`, cancelling it if every copy waiting on it is cancelled."""
+        self._waiters[task] = self._waiters.get(task, 0) + 1
+        try:
+            return await asyncio.shield(task)
+        finally:
+            self._waiters[task] -= 1
+            if not self._waiters[task]:
+                del self._waiters[task]
+                if not task.done():
+                    if self._inflight.get(key) is task:
+                        del self._inflight[key]
+                    task.cancel()
+                    await asyncio.gather(task, return_exceptions=True)
+
+    async def resolve(self, key, compute, site=''):
+        """
+        (entry, hit) for body hash `key` on `site`. Only the first copy of a
+        body runs `compute()`, a coroutine returning a new entry's fields
+        ({'ids', 'rendered', 'rendered_found_more'}, optionally 'healthy');
+        later and concurrent copies reuse its entry. An entry whose IDs came
+        from Chrome is reused only on the same site: a shared third-party
+        loader can pick its container from the hostname, so other sites
+        resolve the body for themselves. An entry with 'healthy': False is
+        handed to the copies already waiting but not stored, so the next
+        copy computes afresh. If every copy waiting on a body is cancelled,
+        so is its computation.
+        """
+        entry = await self._settled(key)
+        if entry is not None and entry['rendered_found_more'] and entry.get('site') != site:
+            key = f"{key}:{site}"
+            entry = await self._settled(key)
+        if entry is None:
+            self.stats['misses'] += 1
+            task = self._inflight[key] = asyncio.ensure_future(self._compute(key, compute, site))
+            return await self._wait(key, task), False
+        self.stats['hits'] += 1
+        if entry['rendered']:
+            self.stats['chrome_skipped'] += 1
+        return entry, True
+
+    async def _compute(self, key, compute, site):
+        try:
+            entry = await compute()
+        finally:
+            if self._inflight.get(key) is asyncio.current_task():
+                del self._inflight[key]
+        self.store(key, site=site, **entry)
+        return entry
+
+    def store(self, key, ids, rendered=False, rendered_found_more=False, healthy=True, site=''):
+        if not healthy:
+            return
+        entries = self._memo()
+        entries[key] = {'ids': sorted(ids), 'rendered': rendered,
+                        'rendered_found_more': rendered_found_more}
+        if rendered_found_more:
+            entries[key]['site'] = site
+        entries.move_to_end(key)
+        while len(entries) > self.max_entries:
+            entries.popitem(last=False)
+
+    def close(self):
+        """Save the memo to `path` (if set and loaded)."""
+        if not self.path or self._entries is None:
+            return
+        tmp = self.path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(self._entries, f)
+        os.replace(tmp, self.path)
+
+    def summary(self):
+        s = self.stats
+        return (f"Body memo: {s['hits']} repeated bodies resolved from memo "
+                f"({s['chrome_skipped']} Chrome runs skipped), {s['misses']} new bodies")
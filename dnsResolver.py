@@ -0,0 +1,135 @@
+import time
+import socket
+import asyncio
+
+# NOTE: standard library only; aiohttp is imported lazily by make_aiohttp_resolver
+
+# -------------------------------------------------------------------
+# Batch DNS pre-resolution with a positive/negative TTL cache
+# -------------------------------------------------------------------
+DNS_POSITIVE_TTL = 300    # seconds to keep resolved addresses
+DNS_NEGATIVE_TTL = 60     # seconds to remember NXDOMAIN answers
+DNS_CONCURRENCY = 50      # lookups in flight at once
+DNS_TIMEOUT = 5           # seconds per lookup
+
+# getaddrinfo errors that mean "this name does not exist" rather than "try again"
+_NXDOMAIN_ERRORS = {socket.EAI_NONAME}
+if hasattr(socket, 'EAI_NODATA'):
+    _NXDOMAIN_ERRORS.add(socket.EAI_NODATA)
+
+async def system_resolve(host, timeout=DNS_TIMEOUT):
+    """
+    Resolve `host` with the system resolver. Returns a list of
+    (family, address) tuples, [] for NXDOMAIN, or None if the lookup failed
+    for another reason (timeout, SERVFAIL) and the answer is unknown.
+    """
+    loop = asyncio.get_running_loop()
+    try:
+        infos = await asyncio.wait_for(
+            loop.getaddrinfo(host, None, type=socket.SOCK_STREAM), timeout
+        )
+    except socket.gaierror as e:
+        return [] if e.errno in _NXDOMAIN_ERRORS else None
+    except (asyncio.TimeoutError, OSError, UnicodeError):
+        return None
+    return list(dict.fromkeys((family, sockaddr[0]) for family, _, _, _, sockaddr in infos))
+
+class DNSCache:
+    """
+    Resolves each host once and remembers the answer: addresses for
+    `positive_ttl` seconds, NXDOMAIN for `negative_ttl`. Concurrent lookups
+    of the same host share one query. `resolve` can be swapped for a stub
+    coroutine with the same contract as system_resolve.
+    """
+
+    def __init__(self, positive_ttl=DNS_POSITIVE_TTL, negative_ttl=DNS_NEGATIVE_TTL,
+                 concurrency=DNS_CONCURRENCY, resolve=system_resolve):
+        self.positive_ttl = positive_ttl
+        self.negative_ttl = negative_ttl
+        self.concurrency = concurrency
+        self._resolve = resolve
+        self._answers = {}
+        self._inflight = {}
+        self._sem = None
+        self.stats = {'resolved': 0, 'nxdomain': 0, 'failed': 0, 'cached': 0}
+
+    def cached(self, host):
+        """The cached answer for `host`, or None if missing or expired."""
+        answer = self._answers.get(host.lower())
+        if answer is None or answer[0] < time.monotonic():
+            return None
+        return answer[1]
+
+    async def resolve(self, host):
+        """Addresses for `host`: a list (empty for NXDOMAIN) or None if unknown."""
+        host = host.lower()
+        addrs = self.cached(host)
+        if addrs is not None:
+            self.stats['cached'] += 1
+            return addrs
+        task = self._inflight.get(host)
+        if task is None:
+            task = self._inflight[host] = asyncio.ensure_future(self._lookup(host))
+        return await asyncio.shield(task)
+
+    async def _lookup(self, host):
+        if self._sem is None:
+            self._sem = asyncio.Semaphore(self.concurrency)
+        try:
+            async with self._sem:
+                addrs = await self._resolve(host)
+        finally:
+            self._inflight.pop(host, None)
+        if addrs is None:
+            self.stats['failed'] += 1
+            return None
+        if addrs:
+            self.stats['resolved'] += 1
+            ttl = self.positive_ttl
+        else:
+            self.stats['nxdomain'] += 1
+            ttl = self.negative_ttl
+        self._answers[host] = (time.monotonic() + ttl, addrs)
+        return addrs
+
+    async def resolve_many(self, hosts):
+        """Resolve every distinct host concurrently. Returns {host: addresses}."""
+        unique = list(dict.fromkeys(h.lower() for h in hosts if h))
+        answers = await asyncio.gather(*(self.resolve(h) for h in unique))
+        return dict(zip(unique, answers))
+
+    def summary(self):
+        s = self.stats
+        return (f"DNS: {s['resolved']} resolved, {s['nxdomain']} NXDOMAIN, "
+                f"{s['failed']} failed, {s['cached']} cache hits")
+
+def make_aiohttp_resolver(dns_cache):
+    """
+    An aiohttp resolver that answers from `dns_cache`, so hosts resolved in
+    the DNS stage are not looked up again for HEAD/GET requests.
+    """
+    from aiohttp.abc import AbstractResolver
+    from aiohttp.resolver import DefaultResolver
+
+    class CachedResolver(AbstractResolver):
+        def __init__(self):
+            self._fallback = DefaultResolver()
+
+        async def resolve(self, host, port=0, family=socket.AF_INET):
+            addrs = await dns_cache.resolve(host)
+            if addrs is None:
+                return await self._fallback.resolve(host, port, family)
+            if not addrs:
+                raise OSError(socket.EAI_NONAME, f"NXDOMAIN: {host}")
+            results = [
+                {'hostname': host, 'host': address, 'port': port,
+                 'family': fam, 'proto': 0, 'flags': socket.AI_NUMERICHOST}
+                for fam, address in addrs
+            ]
+            matching = [r for r in results if family in (socket.AF_UNSPEC, r['family'])]
+            return matching or results
+
+        async def close(self):
+            await self._fallback.close()
+
+    return CachedResolver()
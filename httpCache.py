@@ -0,0 +1,204 @@
+import json
+import time
+import sqlite3
+from urllib.parse import urlparse, urlunparse
+
+# NOTE: shared by GroCSVReader.py and DynamicReader.py; standard library only
+
+# -------------------------------------------------------------------
+# On-disk response cache: tag IDs + validators per normalized URL
+# -------------------------------------------------------------------
+HTTP_CACHE_PATH = 'http_cache_{reader}.sqlite3'   # one file per reader; set to None to disable caching
+HTTP_CACHE_FRESH_FOR = 60 * 60                    # seconds an entry is trusted without asking the server
+HTTP_CACHE_TTL = 30 * 24 * 60 * 60                # seconds before an entry is dropped entirely
+HTTP_CACHE_MAX_ENTRIES = 200_000                  # least recently used entries beyond this are evicted
+HTTP_CACHE_BUSY_TIMEOUT = 30                      # seconds to wait while another process writes
+
+def normalize_url(url):
+    """Canonical cache key: lowercase scheme/host, no default port, fragment or trailing '/'."""
+    url = url.strip()
+    if '://' not in url:
+        url = 'https://' + url
+    parsed = urlparse(url)
+    scheme = parsed.scheme.lower()
+    host = (parsed.hostname or '').lower()
+    if parsed.port and parsed.port != {'http': 80, 'https': 443}.get(scheme):
+        host = f"{host}:{parsed.port}"
+    path = parsed.path.rstrip('/')
+    return urlunparse((scheme, host, path, '', parsed.query, ''))
+
+def cache_path(reader):
+    """
+    The cache file for `reader` (None if caching is off). Readers settle
+    pages with different tiers, so one reader's IDs are no answer for another.
+    """
+    return HTTP_CACHE_PATH.format(reader=reader) if HTTP_CACHE_PATH else None
+
+class ResponseCache:
+    """
+    Persistent cache of the GTM IDs found at each URL, plus the validators
+    (ETag, Last-Modified, content hash) needed to revalidate it cheaply.
+
+    An entry younger than `fresh_for` is a hit and needs no request at all.
+    Older entries are revalidated with a conditional GET; a 304 (or an
+    unchanged content hash) reuses the stored IDs. The database is opened
+    lazily so importing a reader never touches the disk.
+
+    The database runs in WAL mode and every write is committed at once, so
+    no run (or shard) holds the write lock for long and several can share a
+    file. If the file stays locked anyway, the cache steps aside for that
+    call: a lookup is a miss and a write is dropped, never a failed row.
+    """
+
+    def __init__(self, path, fresh_for=HTTP_CACHE_FRESH_FOR,
+                 ttl=HTTP_CACHE_TTL, max_entries=HTTP_CACHE_MAX_ENTRIES):
+        self.path = path
+        self.fresh_for = fresh_for
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.stats = {'hit': 0, 'miss': 0, 'revalidated': 0, 'errors': 0}
+        self._db = None
+
+    @property
+    def enabled(self):
+        return self.path is not None
+
+    def _conn(self):
+        if self._db is None:
+            self._db = sqlite3.connect(self.path, timeout=HTTP_CACHE_BUSY_TIMEOUT)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                " url TEXT PRIMARY KEY, ids TEXT NOT NULL, etag TEXT,"
+                " last_modified TEXT, content_hash TEXT,"
+                " fetched_at REAL NOT NULL, last_used REAL NOT NULL)"
+            )
+            self._evict()
+        return self._db
+
+    def lookup(self, url):
+        """
+        Return the cached entry for `url` (a dict with ids, etag,
+        last_modified, content_hash and fresh), or None. Fresh entries count
+        as hits.
+        """
+        if not self.enabled:
+            return None
+        try:
+            row = self._conn().execute(
+                "SELECT ids, etag, last_modified, content_hash, fetched_at"
+                " FROM responses WHERE url = ?", (normalize_url(url),)
+            ).fetchone()
+        except sqlite3.Error as e:
+            self._unavailable(e)
+            return None
+        if row is None:
+            return None
+        now = time.time()
+        age = now - row[4]
+        if age > self.ttl:
+            return None
+        entry = {
+            'ids': json.loads(row[0]),
+            'etag': row[1],
+            'last_modified': row[2],
+            'content_hash': row[3],
+            'fresh': age <= self.fresh_for,
+        }
+        try:
+            self._write(
+                "UPDATE responses SET last_used = ? WHERE url = ?", (now, normalize_url(url))
+            )
+        except sqlite3.Error as e:
+            self._unavailable(e)
+        if entry['fresh']:
+            self.stats['hit'] += 1
+        return entry
+
+    def conditional_headers(self, entry):
+        """If-None-Match / If-Modified-Since headers for a stale entry."""
+        headers = {}
+        if entry:
+            if entry['etag']:
+                headers['If-None-Match'] = entry['etag']
+            if entry['last_modified']:
+                headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def revalidated(self, url):
+        """The server (or the content hash) confirmed the entry is unchanged."""
+        if not self.enabled:
+            return
+        self.stats['revalidated'] += 1
+        now = time.time()
+        try:
+            self._write(
+                "UPDATE responses SET fetched_at = ?, last_used = ? WHERE url = ?",
+                (now, now, normalize_url(url))
+            )
+        except sqlite3.Error as e:
+            self._unavailable(e)
+
+    def store(self, url, ids, etag=None, last_modified=None, content_hash=None):
+        """Record the IDs found for `url` after a full fetch."""
+        if not self.enabled:
+            return
+        self.stats['miss'] += 1
+        now = time.time()
+        try:
+            self._write(
+                "INSERT OR REPLACE INTO responses"
+                " (url, ids, etag, last_modified, content_hash, fetched_at, last_used)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (normalize_url(url), json.dumps(sorted(set(ids))), etag, last_modified,
+                 content_hash, now, now)
+            )
+        except sqlite3.Error as e:
+            self._unavailable(e)
+
+    def _write(self, sql, params):
+        """Run one write and commit it, releasing the write lock straight away."""
+        db = self._conn()
+        try:
+            db.execute(sql, params)
+            db.commit()
+        except sqlite3.Error:
+            db.rollback()
+            raise
+
+    def _unavailable(self, exc):
+        self.stats['errors'] += 1
+        print(f"[WARN] HTTP cache unavailable ({exc}); continuing without it")
+
+    def summary(self):
+        s = self.stats
+        errors = f", {s['errors']} errors" if s['errors'] else ''
+        return f"HTTP cache: {s['hit']} hits, {s['revalidated']} revalidated, {s['miss']} misses{errors}"
+
+    def close(self):
+        """Evict expired and least recently used entries, then flush to disk."""
+        if self._db is None:
+            return
+        try:
+            self._evict()
+        except sqlite3.Error as e:
+            self._unavailable(e)
+        self._db.close()
+        self._db = None
+
+    def _evict(self):
+        db = self._db
+        try:
+            db.execute("DELETE FROM responses WHERE fetched_at < ?", (time.time() - self.ttl,))
+            (count,) = db.execute("SELECT COUNT(*) FROM responses").fetchone()
+            if count > self.max_entries:
+                db.execute(
+                    "DELETE FROM responses WHERE url IN ("
+                    " SELECT url FROM responses ORDER BY last_used ASC LIMIT ?)",
+                    (count - self.max_entries,)
+                )
+            db.commit()
+        except sqlite3.Error:
+            db.rollback()
+            raise
@@ -0,0 +1,132 @@
+import re
+import asyncio
+from urllib.parse import urljoin, urlparse
+
+from rateLimiter import request_with_retry
+from tagDetector import detect_gtm_ids, gtm_ids, scan_response
+
+# NOTE: used by DynamicReader.py between the plain GET and the Selenium fallback
+
+# -------------------------------------------------------------------
+# Static JS resolution: GTM IDs that only exist once a script runs
+# -------------------------------------------------------------------
+JS_MAX_SCRIPTS = 5                  # first-party <script src> bundles fetched per page
+JS_SCRIPT_MAX_BYTES = 2 * 1024 * 1024   # bytes read per bundle
+JS_SCRIPT_TIMEOUT = 10              # seconds per bundle
+JS_KEEP_CHARS = 1024 * 1024         # page characters kept from the streaming scan
+
+_STRING = r"""'(?:[^'\\\n]|\\.)*'|"(?:[^"\\\n]|\\.)*\""""
+# Only starts where an identifier can: otherwise finditer retries every
+# position inside a long word or base64 run, which is quadratic
+_IDENT = r"(?<![\w$])[A-Za-z_$][\w$]*"
+# ['GTM', 'ABC123'].join('-')
+_JOIN = rf"\[\s*(?:{_STRING})(?:\s*,\s*(?:{_STRING}))*\s*\]\s*\.\s*join\(\s*(?:{_STRING})\s*\)"
+_TOKEN = rf"(?:{_STRING}|{_JOIN}|{_IDENT})"
+
+SCRIPT_TAG_PATTERN = re.compile(r'<script\b([^>]*)>(.*?)</script\s*>', re.IGNORECASE | re.DOTALL)
+SCRIPT_SRC_PATTERN = re.compile(r'''\bsrc\s*=\s*["']?([^"'\s>]+)''', re.IGNORECASE)
+STRING_PATTERN = re.compile(_STRING)
+JOIN_PATTERN = re.compile(_JOIN)
+IDENT_PATTERN = re.compile(_IDENT)
+# var/let/const name = <expression>;
+ASSIGN_PATTERN = re.compile(rf"\b(?:var|let|const)\s+({_IDENT})\s*=\s*({_TOKEN}(?:\s*\+\s*{_TOKEN})*)")
+# 'GTM-' + 'ABC123', prefix + id, ...
+CONCAT_PATTERN = re.compile(rf"{_TOKEN}(?:\s*\+\s*{_TOKEN})+")
+# The standard loader: })(window,document,'script','dataLayer', <id expression>)
+LOADER_CALL_PATTERN = re.compile(
+    rf"\}}\s*\)\s*\(\s*window\s*,\s*document\s*,\s*(?:{_STRING})\s*,\s*(?:{_STRING})\s*,"
+    rf"\s*({_TOKEN}(?:\s*\+\s*{_TOKEN})*)\s*\)"
+)
+
+def _unquote(literal):
+    return re.sub(r"\\(.)", r"\1", literal[1:-1])
+
+def resolve_expression(expr, variables):
+    """
+    Value of a '+' chain of string literals, [...].join() calls and known
+    variables, or None if any part is unknown.
+    """
+    parts = []
+    for token in re.finditer(_TOKEN, expr):
+        text = token.group(0)
+        if STRING_PATTERN.fullmatch(text):
+            parts.append(_unquote(text))
+        elif JOIN_PATTERN.fullmatch(text):
+            *items, sep = [_unquote(s) for s in STRING_PATTERN.findall(text)]
+            parts.append(sep.join(items))
+        elif text in variables:
+            parts.append(variables[text])
+        else:
+            return None
+    return ''.join(parts)
+
+def resolve_script_gtm_ids(js):
+    """
+    GTM IDs a script builds at runtime: loader IIFE arguments, string
+    concatenation and [...].join(), through simple variable assignments.
+    """
+    variables = {}
+    found = set()
+    for m in ASSIGN_PATTERN.finditer(js):
+        value = resolve_expression(m.group(2), variables)
+        if value is not None:
+            variables[m.group(1)] = value
+            found.update(detect_gtm_ids(value))
+    for pattern in (LOADER_CALL_PATTERN, CONCAT_PATTERN, JOIN_PATTERN):
+        for m in pattern.finditer(js):
+            value = resolve_expression(m.group(m.lastindex or 0), variables)
+            if value:
+                found.update(detect_gtm_ids(value))
+    return sorted(found)
+
+def inline_scripts(html):
+    """Bodies of the page's inline <script> tags."""
+    return [body for attrs, body in SCRIPT_TAG_PATTERN.findall(html)
+            if not SCRIPT_SRC_PATTERN.search(attrs) and body.strip()]
+
+def first_party_script_urls(html, page_url):
+    """Absolute <script src> URLs on the page's own site (its registered domain)."""
+    page_host = (urlparse(page_url).hostname or '').lower()
+    site = '.'.join(page_host.split('.')[-2:])
+    urls = []
+    for attrs, _ in SCRIPT_TAG_PATTERN.findall(html):
+        m = SCRIPT_SRC_PATTERN.search(attrs)
+        if not m:
+            continue
+        src = urljoin(page_url, m.group(1))
+        host = (urlparse(src).hostname or '').lower()
+        if (host == page_host or host == site or host.endswith('.' + site)) and src not in urls:
+            urls.append(src)
+    return urls
+
+async def static_gtm_ids(session, page_url, html, limiter=None):
+    """
+    Resolve GTM IDs without a browser: the page's inline scripts first,
+    then up to JS_MAX_SCRIPTS first-party bundles, one level deep (scripts
+    those bundles load are not followed). The regex work runs in the
+    default executor, off the event loop. Returns a sorted list.
+    """
+    loop = asyncio.get_running_loop()
+    found = set()
+    for body in inline_scripts(html):
+        found.update(await loop.run_in_executor(None, resolve_script_gtm_ids, body))
+    if found:
+        return sorted(found)
+
+    for src in first_party_script_urls(html, page_url)[:JS_MAX_SCRIPTS]:
+        try:
+            async with await request_with_retry(
+                session, 'GET', src, limiter, timeout=JS_SCRIPT_TIMEOUT
+            ) as resp:
+                if resp.status != 200:
+                    continue
+                tags, stats = await scan_response(
+                    resp, max_bytes=JS_SCRIPT_MAX_BYTES, keep_text=JS_SCRIPT_MAX_BYTES
+                )
+        except Exception:
+            continue
+        found.update(gtm_ids(tags))
+        found.update(await loop.run_in_executor(None, resolve_script_gtm_ids, stats['text']))
+        if found:
+            break
+    return sorted(found)
@@ -0,0 +1,159 @@
+import time
+import random
+import asyncio
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlparse
+
+# NOTE: shared by GroCSVReader.py and DynamicReader.py; standard library only
+
+# -------------------------------------------------------------------
+# Adaptive per-host / per-IP rate limiting and throttle-aware retries
+# -------------------------------------------------------------------
+RATE_INITIAL = 5.0      # requests per second a new host or IP starts at
+RATE_MIN = 0.2          # floor after repeated throttling
+RATE_MAX = 50.0         # ceiling after repeated successes
+RATE_BURST = 5          # tokens a quiet bucket can save up
+RATE_INCREASE = 0.5     # requests/s added per successful answer (additive increase)
+RATE_DECREASE = 0.5     # factor applied per throttled answer (multiplicative decrease)
+
+RETRY_STATUSES = {429, 503}    # "slow down" answers worth retrying
+RETRY_ATTEMPTS = 3             # retries after the first throttled answer
+RETRY_BASE_DELAY = 0.5         # seconds; doubles per attempt, fully jittered
+RETRY_MAX_DELAY = 30           # longest wait honoured, Retry-After included
+
+def parse_retry_after(value):
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP date), or None."""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when is None:
+        return None
+    return max(0.0, when.timestamp() - time.time())
+
+def backoff_delay(attempt, retry_after=None):
+    """Delay before retry number `attempt` (0-based): Retry-After if given, else full jitter."""
+    if retry_after is not None:
+        return retry_after
+    return random.uniform(0, min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** attempt))
+
+class TokenBucket:
+    """`rate` tokens per second, at most `burst` saved up; paused while a Retry-After runs."""
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+
+    def take(self):
+        """Take a token and return 0, or return the seconds to wait before trying again."""
+        now = time.monotonic()
+        if now < self.paused_until:
+            return self.paused_until - now
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+class HostRateLimiter:
+    """
+    One token bucket per host and one per IP address, so a base domain and
+    its subdomains behind the same CDN or WAF share a budget. Rates adapt
+    AIMD-style: each success adds RATE_INCREASE, each 429/503 multiplies by
+    RATE_DECREASE and empties the bucket, and a Retry-After pauses it.
+
+    `addresses(host)` may return the host's cached (family, address) list;
+    without it only per-host buckets are used.
+    """
+
+    def __init__(self, rate=RATE_INITIAL, burst=RATE_BURST, min_rate=RATE_MIN,
+                 max_rate=RATE_MAX, addresses=None):
+        self.rate = rate
+        self.burst = burst
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.addresses = addresses
+        self._buckets = {}
+        self.stats = {'requests': 0, 'throttled': 0, 'retried': 0, 'delayed': 0}
+
+    def _buckets_for(self, host):
+        keys = [('host', host.lower())]
+        addrs = self.addresses(host) if self.addresses else None
+        if addrs:
+            keys.append(('ip', addrs[0][1]))
+        buckets = []
+        for key in keys:
+            if key not in self._buckets:
+                self._buckets[key] = TokenBucket(self.rate, self.burst)
+            buckets.append(self._buckets[key])
+        return buckets
+
+    async def acquire(self, host):
+        """Wait until both the host's and its IP's buckets allow one more request."""
+        self.stats['requests'] += 1
+        delayed = False
+        for bucket in self._buckets_for(host):
+            while True:
+                wait = bucket.take()
+                if not wait:
+                    break
+                delayed = True
+                await asyncio.sleep(wait)
+        self.stats['delayed'] += delayed
+
+    def feedback(self, host, status, retry_after=None):
+        """Adapt the host's (and IP's) rate to the answer's status code."""
+        throttled = status in RETRY_STATUSES
+        if throttled:
+            self.stats['throttled'] += 1
+        for bucket in self._buckets_for(host):
+            if not throttled:
+                bucket.rate = min(self.max_rate, bucket.rate + RATE_INCREASE)
+                continue
+            bucket.rate = max(self.min_rate, bucket.rate * RATE_DECREASE)
+            bucket.tokens = 0
+            if retry_after:
+                pause = time.monotonic() + min(retry_after, RETRY_MAX_DELAY)
+                bucket.paused_until = max(bucket.paused_until, pause)
+
+    def summary(self):
+        s = self.stats
+        return (f"Rate limiter: {s['requests']} requests, {s['throttled']} throttled, "
+                f"{s['retried']} retried, {s['delayed']} delayed by the limiter")
+
+async def request_with_retry(session, method, url, limiter=None, attempts=None, **kwargs):
+    """
+    Send `method url` through `limiter`, retrying 429/503 answers up to
+    `attempts` times (default RETRY_ATTEMPTS) after a jittered backoff or the
+    server's Retry-After. Returns the response for use with `async with`; it
+    is still a 429/503 when retries ran out or the server asked for a wait
+    longer than RETRY_MAX_DELAY.
+    """
+    if attempts is None:
+        attempts = RETRY_ATTEMPTS
+    host = urlparse(url).hostname or ''
+    for attempt in range(attempts + 1):
+        if limiter:
+            await limiter.acquire(host)
+        resp = await session.request(method, url, **kwargs)
+        retry_after = None
+        if resp.status in RETRY_STATUSES:
+            retry_after = parse_retry_after(resp.headers.get('Retry-After'))
+        if limiter:
+            limiter.feedback(host, resp.status, retry_after)
+        if (resp.status not in RETRY_STATUSES or attempt == attempts
+                or (retry_after or 0) > RETRY_MAX_DELAY):
+            return resp
+        resp.release()
+        if limiter:
+            limiter.stats['retried'] += 1
+        await asyncio.sleep(backoff_delay(attempt, retry_after))
@@ -0,0 +1,54 @@
+import os
+import json
+
+# NOTE: shared by GroCSVReader.py and DynamicReader.py; standard library only
+
+# -------------------------------------------------------------------
+# Append-only JSONL checkpoint journal: one line per finished row
+# -------------------------------------------------------------------
+class RunJournal:
+    """
+    Records each row's results as soon as the row finishes, so a crashed or
+    interrupted run can resume with only the unfinished rows. Every record is
+    flushed immediately; a torn last line from a crash is ignored on load.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = None
+
+    def load(self, make=None):
+        """
+        Return {row: record} for every complete line (later lines win);
+        `make(record)`, if given, converts each record as it is read.
+        """
+        records = {}
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue
+                    if isinstance(record, dict) and 'row' in record:
+                        records[record['row']] = make(record) if make else record
+        except FileNotFoundError:
+            pass
+        return records
+
+    def start(self, resume=False):
+        """Open for appending; without `resume` any previous journal is discarded."""
+        if not resume and os.path.exists(self.path):
+            os.remove(self.path)
+        self._file = open(self.path, 'a', encoding='utf-8')
+
+    def record(self, row, **fields):
+        if self._file is None:
+            return
+        self._file.write(json.dumps({'row': row, **fields}) + '\n')
+        self._file.flush()
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
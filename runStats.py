@@ -0,0 +1,165 @@
+import sys
+import json
+import time
+import bisect
+import threading
+from contextlib import contextmanager
+
+# NOTE: shared by GroCSVReader.py and DynamicReader.py; standard library only
+
+# -------------------------------------------------------------------
+# Per-stage timing, counters and a machine-readable run report
+# -------------------------------------------------------------------
+# Upper bounds (seconds) of the latency histogram buckets; the last is open-ended
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, float('inf'))
+PROGRESS_INTERVAL = 1.0    # seconds between live progress line updates
+
+def _bucket_label(bound):
+    return '+Inf' if bound == float('inf') else f"{bound:g}"
+
+class RunStats:
+    """
+    Collects, per stage, a latency histogram plus bytes, error classes and
+    timeouts, along with free-form counters. Safe to use from the event loop
+    and from executor threads (Selenium). `report()` turns it into a
+    JSON-ready dict; `progress=True` keeps a live one-line summary on stderr.
+    """
+
+    def __init__(self, progress=False):
+        self.progress = progress
+        self.started = time.time()
+        self._lock = threading.Lock()
+        self._stages = {}
+        self.counters = {}
+        self.shards = []
+        self._last_progress = 0.0
+
+    def _stage(self, name):
+        stage = self._stages.get(name)
+        if stage is None:
+            stage = self._stages[name] = {
+                'count': 0, 'total': 0.0, 'max': 0.0,
+                'buckets': [0] * len(LATENCY_BUCKETS),
+                'bytes': 0, 'errors': {}, 'timeouts': 0,
+            }
+        return stage
+
+    def observe(self, name, seconds):
+        """Record one `seconds`-long call of stage `name`."""
+        with self._lock:
+            stage = self._stage(name)
+            stage['count'] += 1
+            stage['total'] += seconds
+            stage['max'] = max(stage['max'], seconds)
+            stage['buckets'][bisect.bisect_left(LATENCY_BUCKETS, seconds)] += 1
+
+    @contextmanager
+    def timed(self, name):
+        """Time the block as one call of stage `name`; exceptions are recorded and re-raised."""
+        start = time.perf_counter()
+        try:
+            yield
+        except Exception as e:
+            self.error(name, e)
+            raise
+        finally:
+            self.observe(name, time.perf_counter() - start)
+
+    def error(self, name, exc):
+        """Count an exception against stage `name` by class; *Timeout* classes also count as timeouts."""
+        kind = type(exc).__name__
+        with self._lock:
+            stage = self._stage(name)
+            stage['errors'][kind] = stage['errors'].get(kind, 0) + 1
+            if 'Timeout' in kind:
+                stage['timeouts'] += 1
+
+    def add_bytes(self, name, count):
+        with self._lock:
+            self._stage(name)['bytes'] += count
+
+    def count(self, name, n=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+        if self.progress:
+            self.print_progress()
+
+    def print_progress(self, final=False):
+        """Rewrite the live progress line (at most every PROGRESS_INTERVAL seconds)."""
+        now = time.monotonic()
+        if not final and now - self._last_progress < PROGRESS_INTERVAL:
+            return
+        self._last_progress = now
+        c = self.counters
+        stages = ', '.join(f"{name} {s['count']}" for name, s in sorted(self._stages.items()))
+        elapsed = time.time() - self.started
+        sys.stderr.write(f"\r[PROGRESS] {c.get('rows', 0)} rows in {elapsed:.0f}s | {stages}\033[K")
+        if final:
+            sys.stderr.write('\n')
+        sys.stderr.flush()
+
+    @staticmethod
+    def _percentile(buckets, count, pct):
+        """Upper bound of the bucket holding the pct-th percentile."""
+        rank = count * pct / 100
+        seen = 0
+        for bound, n in zip(LATENCY_BUCKETS, buckets):
+            seen += n
+            if seen >= rank and n:
+                return bound if bound != float('inf') else None
+        return None
+
+    def report(self, **extra):
+        """JSON-ready dict of everything recorded; `extra` sections are included as-is."""
+        with self._lock:
+            stages = {}
+            for name, s in sorted(self._stages.items()):
+                stages[name] = {
+                    'count': s['count'],
+                    'total_seconds': round(s['total'], 3),
+                    'mean_seconds': round(s['total'] / s['count'], 4) if s['count'] else None,
+                    'p50_seconds': self._percentile(s['buckets'], s['count'], 50),
+                    'p95_seconds': self._percentile(s['buckets'], s['count'], 95),
+                    'max_seconds': round(s['max'], 3),
+                    'histogram': {_bucket_label(b): n for b, n in zip(LATENCY_BUCKETS, s['buckets'])},
+                    'bytes': s['bytes'],
+                    'errors': dict(s['errors']),
+                    'timeouts': s['timeouts'],
+                }
+            return {
+                'started_at': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(self.started)),
+                'elapsed_seconds': round(time.time() - self.started, 3),
+                'stages': stages,
+                'counters': dict(self.counters),
+                **({'shards': list(self.shards)} if self.shards else {}),
+                **extra,
+            }
+
+    def merge(self, report):
+        """
+        Fold a report() from another process (e.g. a shard worker) into this
+        one: stages and counters are summed, its other sections are kept
+        as-is under 'shards'.
+        """
+        with self._lock:
+            self.shards.append({k: v for k, v in report.items() if k not in ('stages', 'counters')})
+            for name, r in report.get('stages', {}).items():
+                stage = self._stage(name)
+                stage['count'] += r['count']
+                stage['total'] += r['total_seconds']
+                stage['max'] = max(stage['max'], r['max_seconds'])
+                for i, b in enumerate(LATENCY_BUCKETS):
+                    stage['buckets'][i] += r['histogram'].get(_bucket_label(b), 0)
+                stage['bytes'] += r['bytes']
+                stage['timeouts'] += r['timeouts']
+                for kind, n in r['errors'].items():
+                    stage['errors'][kind] = stage['errors'].get(kind, 0) + n
+            for name, n in report.get('counters', {}).items():
+                self.counters[name] = self.counters.get(name, 0) + n
+
+    def write_report(self, path, **extra):
+        if self.progress:
+            self.print_progress(final=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.report(**extra), f, indent=2)
+        print(f"[INFO] Run report saved to '{path}'")
@@ -0,0 +1,53 @@
+import asyncio
+
+# NOTE: shared by GroCSVReader.py and DynamicReader.py; standard library only
+
+# -------------------------------------------------------------------
+# Producer/consumer pipeline: each item moves to the next stage as soon
+# as the previous stage finishes it, instead of waiting for the batch
+# -------------------------------------------------------------------
+PIPELINE_QUEUE_SIZE = 50    # items buffered between two stages
+
+_DONE = object()
+
+async def run_pipeline(items, stages, queue_size=PIPELINE_QUEUE_SIZE, describe=repr):
+    """
+    Push every item through `stages`, a list of (name, coroutine_fn,
+    concurrency). Each stage runs `concurrency` workers that pull from a
+    bounded queue and hand the item to the next stage's queue. A stage
+    function that raises drops the item (with a warning, naming it with
+    `describe`) rather than stopping the pipeline. `items` is consumed
+    lazily, so a generator keeps only the in-flight items in memory.
+    """
+    queues = [asyncio.Queue(maxsize=queue_size) for _ in stages]
+
+    async def worker(i, name, fn):
+        while True:
+            item = await queues[i].get()
+            if item is _DONE:
+                return
+            try:
+                await fn(item)
+            except Exception as e:
+                print(f"[WARN] {name} stage failed for {describe(item)}: {e}")
+                continue
+            if i + 1 < len(queues):
+                await queues[i + 1].put(item)
+
+    async def run_stage(i, name, fn, concurrency):
+        await asyncio.gather(*(worker(i, name, fn) for _ in range(concurrency)))
+        # Stage drained: release the next stage's workers
+        if i + 1 < len(stages):
+            for _ in range(stages[i + 1][2]):
+                await queues[i + 1].put(_DONE)
+
+    async def feed():
+        for item in items:
+            await queues[0].put(item)
+        for _ in range(stages[0][2]):
+            await queues[0].put(_DONE)
+
+    await asyncio.gather(
+        feed(),
+        *(run_stage(i, name, fn, conc) for i, (name, fn, conc) in enumerate(stages))
+    )
@@ -0,0 +1,124 @@
+import time
+import asyncio
+from urllib.parse import urlparse
+
+# NOTE: shared by GroCSVReader.py and DynamicReader.py; standard library only
+
+# -------------------------------------------------------------------
+# Priority scheduling: likely-GTM URLs first, under time budgets
+# -------------------------------------------------------------------
+ROW_TIME_BUDGET = 60          # seconds one row's URLs may take
+RUN_TIME_BUDGET = None        # seconds for the whole run (None: no deadline)
+PRIORITY_CONFIDENCE = 0.5     # share of a row's expected value scanned before stopping on a find
+PRIORITY_CONCURRENCY = 3      # URLs of one row scanned at once
+
+# Expected value of scanning a URL: where organizations put their container
+APEX_WEIGHT = 1.0
+WWW_WEIGHT = 0.8
+MARKETING_WEIGHT = 0.3
+OTHER_WEIGHT = 0.1
+MARKETING_PREFIXES = {
+    'shop', 'store', 'blog', 'news', 'info', 'go', 'get', 'try', 'join',
+    'promo', 'offers', 'events', 'careers', 'jobs', 'learn', 'about',
+    'en', 'us', 'home', 'donate', 'give', 'support',
+}
+
+def url_priority(url, base_domain):
+    """Expected value of scanning `url` for a row whose base domain is `base_domain`."""
+    host = (urlparse(url if '://' in url else f"https://{url}").hostname or '').lower()
+    base_domain = base_domain.lower()
+    if host == base_domain:
+        return APEX_WEIGHT
+    label = host[:-len(base_domain) - 1] if host.endswith('.' + base_domain) else host
+    if label == 'www':
+        return WWW_WEIGHT
+    if label.split('.')[-1] in MARKETING_PREFIXES:
+        return MARKETING_WEIGHT
+    return OTHER_WEIGHT
+
+class PriorityScheduler:
+    """
+    Scans a row's URLs in order of url_priority, `concurrency` at a time,
+    and stops early once an ID has been found and the URLs done carry
+    `confidence` of the row's total expected value. A row gets `row_budget`
+    seconds; the run-wide `run_budget` starts with the first row scanned,
+    after which rows scan nothing. Unscanned URLs are counted as skipped.
+    """
+
+    def __init__(self, row_budget=ROW_TIME_BUDGET, run_budget=RUN_TIME_BUDGET,
+                 confidence=PRIORITY_CONFIDENCE, concurrency=PRIORITY_CONCURRENCY):
+        self.row_budget = row_budget
+        self.run_budget = run_budget
+        self.confidence = confidence
+        self.concurrency = concurrency
+        self._run_deadline = None
+        self.stats = {'rows': 0, 'scanned': 0, 'skipped': 0,
+                      'confident': 0, 'row_budget': 0, 'run_budget': 0}
+
+    def run_remaining(self):
+        """Seconds left in the run budget (None without one)."""
+        if self.run_budget is None:
+            return None
+        if self._run_deadline is None:
+            self._run_deadline = time.monotonic() + self.run_budget
+        return self._run_deadline - time.monotonic()
+
+    def run_expired(self):
+        remaining = self.run_remaining()
+        return remaining is not None and remaining <= 0
+
+    async def scan(self, urls, base_domain, scan):
+        """
+        Run coroutine `scan(url)` -> list of IDs over `urls` in priority order.
+        Returns (sorted IDs found, number of URLs scanned).
+        """
+        weights = {u: url_priority(u, base_domain) for u in dict.fromkeys(urls)}
+        pending = sorted(weights, key=weights.get, reverse=True)
+        total = sum(weights.values()) or 1.0
+        row_deadline = time.monotonic() + self.row_budget
+        running = {}
+        found = set()
+        covered = 0.0
+        scanned = 0
+        self.stats['rows'] += 1
+
+        try:
+            while pending or running:
+                while pending and len(running) < self.concurrency:
+                    url = pending.pop(0)
+                    running[asyncio.ensure_future(scan(url))] = url
+                timeout = row_deadline - time.monotonic()
+                run_left = self.run_remaining()
+                if run_left is not None and run_left < timeout:
+                    if run_left <= 0:
+                        self.stats['run_budget'] += 1
+                        break
+                    timeout = run_left
+                if timeout <= 0:
+                    self.stats['row_budget'] += 1
+                    break
+                done, _ = await asyncio.wait(running, timeout=timeout,
+                                             return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    covered += weights[running.pop(task)]
+                    scanned += 1
+                    if task.exception() is None:
+                        found.update(task.result())
+                if found and covered / total >= self.confidence:
+                    self.stats['confident'] += 1
+                    break
+        finally:
+            for task in running:
+                task.cancel()
+            if running:
+                await asyncio.gather(*running, return_exceptions=True)
+
+        self.stats['scanned'] += scanned
+        self.stats['skipped'] += len(weights) - scanned
+        return sorted(found), scanned
+
+    def summary(self):
+        s = self.stats
+        return (f"Priority scan: {s['rows']} rows, {s['scanned']} URLs scanned, "
+                f"{s['skipped']} skipped ({s['confident']} rows confident, "
+                f"{s['row_budget']} out of row budget, {s['run_budget']} past the run deadline)")
@@ -0,0 +1,127 @@
+import os
+import glob
+import zlib
+import asyncio
+import importlib
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+from httpCache import ResponseCache
+from runJournal import RunJournal
+
+# NOTE: shared by GroCSVReader.py and DynamicReader.py; standard library only
+
+# -------------------------------------------------------------------
+# Multi-process sharded runs: rows split across workers by base domain
+# -------------------------------------------------------------------
+# Fresh interpreters: no event loop, thread or Chrome driver is inherited
+SHARD_START_METHOD = 'spawn'
+
+def shard_of(base_domain, shards):
+    """Stable shard number for a base domain, the same in every process and run."""
+    return zlib.crc32(base_domain.lower().encode('utf-8')) % shards
+
+def shard_journal_path(journal_path, shard):
+    root, ext = os.path.splitext(journal_path)
+    return f"{root}.shard{shard}{ext}"
+
+def _shard_journals(journal_path):
+    root, ext = os.path.splitext(journal_path)
+    return glob.glob(f"{glob.escape(root)}.shard*{ext}")
+
+def merge_shard_journals(journal_path):
+    """
+    Fold every shard journal into the main one, in row order, and remove the
+    shard files. Returns the number of rows merged.
+    """
+    records = {}
+    paths = _shard_journals(journal_path)
+    for path in paths:
+        records.update(RunJournal(path).load())
+    if records:
+        journal = RunJournal(journal_path)
+        journal.start(resume=True)
+        for row in sorted(records):
+            journal.record(row, **{k: v for k, v in records[row].items() if k != 'row'})
+        journal.close()
+    for path in paths:
+        os.remove(path)
+    return len(records)
+
+def run_shard(reader_name, csv_path, shard, shards, journal_path, resume, settings=None):
+    """
+    Worker process entry point: scan this shard's rows with the reader's
+    own flow, event loop and browser pool, journaling to a shard journal.
+    `settings` (the command-line options) go to reader.apply_settings(),
+    since a spawned worker imports the reader with its defaults.
+    Returns the number of rows scanned and the shard's run report.
+    """
+    reader = importlib.import_module(reader_name)
+    if settings:
+        reader.apply_settings(**settings)
+    done = RunJournal(journal_path).load() if resume else {}
+    reader.RUN_JOURNAL = RunJournal(shard_journal_path(journal_path, shard))
+    reader.RESPONSE_CACHE = ResponseCache(reader.RESPONSE_CACHE.path)
+    scanned = 0
+
+    def shard_items():
+        nonlocal scanned
+        for entry in reader.iter_work_items(csv_path):
+            if shard_of(entry.base_domain, shards) != shard:
+                continue
+            if done.get(entry.row, {}).get('website') == entry.website:
+                continue
+            scanned += 1
+            yield entry
+
+    flow = reader.pipeline_scan if reader.PIPELINED else reader.discover_then_scan
+    reader.RUN_JOURNAL.start()
+    try:
+        asyncio.run(flow(shard_items()))
+    finally:
+        reader.RUN_JOURNAL.close()
+        if hasattr(reader, 'SELENIUM_POOL'):
+            reader.SELENIUM_POOL.close()
+        if hasattr(reader, 'BODY_MEMO'):
+            reader.BODY_MEMO.close()
+        reader.RESPONSE_CACHE.close()
+    print(f"[INFO] Shard {shard + 1}/{shards}: {scanned} rows scanned")
+    return scanned, reader.RUN_STATS.report(shard=shard, **reader.run_report_sections())
+
+def run_sharded(reader_name, csv_path, workers, journal_path, resume=False, stats=None, settings=None):
+    """
+    Scan the sheet with `workers` processes, each taking the rows whose base
+    domain hashes to its shard. Every finished row ends up in the main
+    journal (sorted by row), so the usual journal-driven write-back restores
+    the original row order. Workers apply `settings` (see run_shard).
+    Each shard's run report is merged into `stats` (a RunStats), if given.
+    Returns the number of rows scanned.
+    """
+    journal_path = os.path.abspath(journal_path)
+    if resume:
+        # Shard journals left by an interrupted sharded run are valid results
+        merge_shard_journals(journal_path)
+    else:
+        for path in _shard_journals(journal_path) + [journal_path]:
+            if os.path.exists(path):
+                os.remove(path)
+
+    print(f"[INFO] Scanning in {workers} worker processes...")
+    context = multiprocessing.get_context(SHARD_START_METHOD)
+    try:
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+            futures = [
+                pool.submit(run_shard, reader_name, os.path.abspath(csv_path),
+                            shard, workers, journal_path, resume, settings)
+                for shard in range(workers)
+            ]
+            scanned = 0
+            for f in futures:
+                rows, report = f.result()
+                scanned += rows
+                if stats is not None:
+                    stats.merge(report)
+            return scanned
+    finally:
+        # Runs after every worker has exited, even if one of them failed
+        merge_shard_journals(journal_path)
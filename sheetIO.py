@@ -0,0 +1,54 @@
+import os
+import pandas as pd
+
+# NOTE: shared by GroCSVReader.py and DynamicReader.py; requires pandas
+
+# -------------------------------------------------------------------
+# Chunked sheet reading and batched result write-back
+# -------------------------------------------------------------------
+CSV_CHUNK_SIZE = 10_000    # rows held in memory at once while reading or writing
+
+def read_sheet_chunks(path, chunksize=CSV_CHUNK_SIZE):
+    """
+    Yield the sheet `chunksize` rows at a time. Every column is read as text,
+    so IDs, ZIP codes, etc. round-trip unchanged; the index keeps counting
+    across chunks, so it matches the row numbers of a whole-file read.
+    """
+    yield from pd.read_csv(path, chunksize=chunksize, dtype=str)
+
+def text_column(chunk, name, default=''):
+    """A stripped text column of `chunk`, with missing cells (or a missing column) as `default`."""
+    if name not in chunk.columns:
+        return pd.Series(default, index=chunk.index, dtype=object)
+    return chunk[name].fillna(default).str.strip()
+
+def split_cell(cell):
+    """Split a comma separated cell into its non-empty, stripped parts."""
+    return [part.strip() for part in cell.split(',') if part.strip()]
+
+def write_sheet(in_path, out_path, updates, fill=None, chunksize=CSV_CHUNK_SIZE):
+    """
+    Copy `in_path` to `out_path` chunk by chunk, applying `updates`
+    ({column: {row: value}}) with one vectorized assignment per column and
+    chunk. `fill` ({column: value}) replaces missing cells as it goes. The
+    output is written to a temporary file and moved into place at the end.
+    """
+    new_values = {col: pd.Series(values, dtype=object) for col, values in updates.items()}
+    tmp_path = out_path + '.tmp'
+    header = True
+    for chunk in read_sheet_chunks(in_path, chunksize):
+        if fill:
+            chunk = chunk.fillna(fill)
+        for col, values in new_values.items():
+            if col not in chunk.columns:
+                chunk[col] = None
+            rows = chunk.index.intersection(values.index)
+            if len(rows):
+                chunk[col] = chunk[col].astype(object)
+                chunk.loc[rows, col] = values.loc[rows]
+        chunk.to_csv(tmp_path, mode='w' if header else 'a', header=header, index=False)
+        header = False
+    if header:
+        # Header-only sheet: nothing was streamed, copy the header line
+        pd.read_csv(in_path, nrows=0).to_csv(tmp_path, index=False)
+    os.replace(tmp_path, out_path)
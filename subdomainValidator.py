@@ -1,21 +1,86 @@
 import csv
 import socket
+import asyncio
 import argparse
 from urllib.parse import urlparse
+from dnsResolver import DNSCache
 
-NOTE: No special libraries are needed to use this program!
+# NOTE: No special libraries are needed to use this program!
+
+DEFAULT_CONCURRENCY = 100   # reachability checks in flight at once
+PORT_STAGGER = 0.25         # seconds port 80 gets before port 443 is also tried
 
 def is_domain_reachable(domain, timeout=5):
     """Check if a domain is reachable via HTTP/HTTPS ports."""
-    try:
-        socket.create_connection((domain, 80), timeout=timeout)
-        return True
-    except (socket.gaierror, socket.timeout, ConnectionRefusedError, OSError):
+    for port in (80, 443):
         try:
-            socket.create_connection((domain, 443), timeout=timeout)
-            return True
+            with socket.create_connection((domain, port), timeout=timeout):
+                return True
         except (socket.gaierror, socket.timeout, ConnectionRefusedError, OSError):
+            continue
+    return False
+
+async def try_connect(domain, port, timeout):
+    """Open and immediately close a TCP connection; True if it succeeded."""
+    try:
+        _, writer = await asyncio.wait_for(asyncio.open_connection(domain, port), timeout)
+    except (asyncio.TimeoutError, OSError):
+        return False
+    writer.close()
+    try:
+        await writer.wait_closed()
+    except OSError:
+        pass
+    return True
+
+async def is_domain_reachable_async(domain, timeout=5, stagger=PORT_STAGGER):
+    """
+    Happy-Eyeballs-style check: port 80 starts first, port 443 joins after
+    `stagger` seconds (or as soon as 80 fails), and the first success wins.
+    The losing attempt is cancelled so no socket is left open.
+    """
+    attempts = [asyncio.ensure_future(try_connect(domain, 80, timeout))]
+    try:
+        done, _ = await asyncio.wait(attempts, timeout=stagger)
+        if done and attempts[0].result():
+            return True
+        attempts.append(asyncio.ensure_future(try_connect(domain, 443, timeout)))
+        for attempt in asyncio.as_completed(attempts):
+            if await attempt:
+                return True
+        return False
+    finally:
+        for attempt in attempts:
+            attempt.cancel()
+        await asyncio.gather(*attempts, return_exceptions=True)
+
+async def check_domains(domains, concurrency=DEFAULT_CONCURRENCY, dns_cache=None):
+    """
+    Resolve each distinct domain once, then TCP-check the ones that exist,
+    `concurrency` at a time. NXDOMAIN hosts are unreachable without any
+    connection attempt; the others are dialled by resolved address, each
+    address in turn until one answers.
+    Returns {domain: reachable}.
+    """
+    dns_cache = dns_cache or DNSCache(concurrency=concurrency)
+    sem = asyncio.Semaphore(concurrency)
+    unique = list(dict.fromkeys(domains))
+    answers = await dns_cache.resolve_many(unique)
+
+    async def check(domain):
+        addrs = answers.get(domain.lower())
+        if addrs == []:
             return False
+        targets = [addr for _, addr in addrs] if addrs else [domain]
+        async with sem:
+            for target in targets:
+                if await is_domain_reachable_async(target):
+                    return True
+            return False
+
+    results = await asyncio.gather(*(check(d) for d in unique))
+    print(dns_cache.summary())
+    return dict(zip(unique, results))
 
 def extract_domain(url):
     """Extract domain from URL with various formats."""
@@ -50,10 +115,11 @@ def find_header_and_index(rows, col_name):
         raise ValueError(f"Column '{col_name}' not found in CSV.")
     return header_row, col_index
 
-def process_csv(input_file, output_file, column_name='Subdomain(s)'):
+def process_csv(input_file, output_file, column_name='Subdomain(s)', concurrency=DEFAULT_CONCURRENCY):
     """
     Process a CSV file to check subdomains, keep all rows (including ones without
     subdomain data or having 'N/A'), and preserve original spacing/order.
+    Reachability checks run concurrently, `concurrency` at a time.
     """
     with open(input_file, 'r', encoding='utf-8', newline='') as f:
         lines = f.readlines()
@@ -78,10 +144,8 @@ def process_csv(input_file, output_file, column_name='Subdomain(s)'):
     # We'll preserve every line's spacing, so mark all lines to keep
     keep_line_indices = set(range(len(lines)))
 
-    total = 0
-    working = 0
-
-    # Check subdomains for subsequent rows but do not remove them
+    # Collect subdomains from subsequent rows but do not remove them
+    domains = []
     for i, row in enumerate(parsed_rows):
         if i <= header_row_idx:
             continue
@@ -94,14 +158,17 @@ def process_csv(input_file, output_file, column_name='Subdomain(s)'):
         if not raw_domain or raw_domain.lower() == 'n/a':
             continue
 
-        total += 1
         try:
-            domain = extract_domain(raw_domain)
-            if domain and is_domain_reachable(domain):
-                working += 1
+            domains.append(extract_domain(raw_domain))
         except Exception as e:
+            domains.append(None)
             print(f"Error processing '{raw_domain}': {e}")
 
+    # Check every distinct subdomain concurrently
+    reachable = asyncio.run(check_domains([d for d in domains if d], concurrency))
+    total = len(domains)
+    working = sum(1 for d in domains if d and reachable[d])
+
     # Write out every line, since we keep them all
     with open(output_file, 'w', encoding='utf-8', newline='') as out:
         for idx, line in enumerate(lines):
@@ -117,9 +184,11 @@ if __name__ == "__main__":
     parser.add_argument('output', help='Output CSV file path')
     parser.add_argument('--column', default='Subdomain(s)',
                         help='Column name containing subdomains (default: "Subdomain(s)")')
+    parser.add_argument('--concurrency', type=int, default=DEFAULT_CONCURRENCY,
+                        help=f'Reachability checks in flight at once (default: {DEFAULT_CONCURRENCY})')
     args = parser.parse_args()
     try:
-        process_csv(args.input, args.output, args.column)
+        process_csv(args.input, args.output, args.column, args.concurrency)
     except Exception as e:
         print(f"Error: {e}")
         exit(1)
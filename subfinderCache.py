@@ -0,0 +1,119 @@
+import os
+import json
+import time
+import asyncio
+
+# NOTE: shared by GroCSVReader.py and DynamicReader.py; requires `subfinder` on PATH
+
+# -------------------------------------------------------------------
+# Async subfinder runs with a per-domain on-disk result cache
+# -------------------------------------------------------------------
+SUBFINDER_CACHE_DIR = '.subfinder_cache'    # set to None to disable caching
+SUBFINDER_CACHE_TTL = 7 * 24 * 60 * 60      # seconds before a domain is enumerated again
+SUBFINDER_TIMEOUT = 120                     # seconds per subfinder run
+SUBFINDER_CONCURRENCY = 10                  # subfinder processes running at once
+
+def _cache_file(domain, cache_dir):
+    return os.path.join(cache_dir, f"{domain.lower()}.json")
+
+def load_cached_subdomains(domain, cache_dir=SUBFINDER_CACHE_DIR, ttl=SUBFINDER_CACHE_TTL):
+    """Return the cached raw subfinder lines for `domain`, or None if missing/expired."""
+    if cache_dir is None:
+        return None
+    try:
+        with open(_cache_file(domain, cache_dir), 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if time.time() - data.get('fetched_at', 0) > ttl:
+        return None
+    return data.get('subdomains', [])
+
+def save_cached_subdomains(domain, lines, cache_dir=SUBFINDER_CACHE_DIR):
+    if cache_dir is None:
+        return
+    os.makedirs(cache_dir, exist_ok=True)
+    path = _cache_file(domain, cache_dir)
+    tmp = path + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump({'fetched_at': time.time(), 'subdomains': lines}, f)
+    os.replace(tmp, path)
+
+async def run_subfinder(domain, timeout=SUBFINDER_TIMEOUT):
+    """
+    Run `subfinder -d domain -silent` without blocking the event loop.
+    Returns the raw output lines, or None if subfinder failed.
+    """
+    try:
+        proc = await asyncio.create_subprocess_exec(
+            'subfinder', '-d', domain, '-silent',
+            stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE
+        )
+    except OSError as e:
+        print(f"[WARN] Could not start subfinder for {domain}: {e}")
+        return None
+
+    try:
+        stdout, stderr = await asyncio.wait_for(proc.communicate(), timeout)
+    except asyncio.TimeoutError:
+        proc.kill()
+        await proc.wait()
+        print(f"[WARN] Subfinder timed out for {domain}")
+        return None
+
+    if proc.returncode != 0:
+        print(f"[WARN] Subfinder error for {domain}: {stderr.decode(errors='replace')}")
+        return None
+    return stdout.decode(errors='replace').splitlines()
+
+class SubfinderRunner:
+    """
+    Enumerates each distinct domain at most once per run. Cached results are
+    reused; the rest run through subfinder `concurrency` at a time and are
+    cached on success. Concurrent requests for the same domain share one run.
+    """
+
+    def __init__(self, concurrency=SUBFINDER_CONCURRENCY,
+                 cache_dir=SUBFINDER_CACHE_DIR, ttl=SUBFINDER_CACHE_TTL):
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        self._sem = asyncio.Semaphore(concurrency)
+        self._runs = {}
+        self.stats = {'cached': 0, 'enumerated': 0, 'failed': 0}
+
+    async def get(self, domain):
+        """Raw subfinder lines for `domain` (empty list on failure)."""
+        if domain not in self._runs:
+            self._runs[domain] = asyncio.ensure_future(self._enumerate(domain))
+        return await self._runs[domain]
+
+    async def _enumerate(self, domain):
+        lines = load_cached_subdomains(domain, self.cache_dir, self.ttl)
+        if lines is not None:
+            self.stats['cached'] += 1
+            return lines
+        async with self._sem:
+            lines = await run_subfinder(domain)
+        if lines is None:
+            self.stats['failed'] += 1
+            return []
+        self.stats['enumerated'] += 1
+        save_cached_subdomains(domain, lines, self.cache_dir)
+        return lines
+
+    def summary(self):
+        s = self.stats
+        return (f"Subfinder: {len(self._runs)} distinct domains, {s['cached']} from cache, "
+                f"{s['enumerated']} enumerated, {s['failed']} failed")
+
+async def enumerate_subdomains(domains, concurrency=SUBFINDER_CONCURRENCY,
+                               cache_dir=SUBFINDER_CACHE_DIR, ttl=SUBFINDER_CACHE_TTL):
+    """
+    Enumerate every distinct domain up front.
+    Returns {domain: raw subfinder lines} (empty list on failure).
+    """
+    runner = SubfinderRunner(concurrency, cache_dir, ttl)
+    unique = sorted(set(domains))
+    lines = await asyncio.gather(*(runner.get(d) for d in unique))
+    print(f"[INFO] {runner.summary()}")
+    return dict(zip(unique, lines))
@@ -0,0 +1,191 @@
+import re
+import codecs
+from collections import namedtuple
+
+# NOTE: shared by GroCSVReader.py and DynamicReader.py; standard library only
+
+# -------------------------------------------------------------------
+# Single-pass tag detector: GTM, GA4, UA, Google Ads and Meta Pixel
+# -------------------------------------------------------------------
+TagMatch = namedtuple('TagMatch', ['kind', 'id'])
+
+TAG_KINDS = ('GTM', 'GA4', 'UA', 'AW', 'PIXEL')
+
+# One precompiled alternation; the named group that matched is the tag kind.
+# Branches open with their bare literal prefix (boundary checked by a
+# lookbehind just after it) so the regex engine can skip ahead on those
+# literals; wrapping the prefix in a group would disable that.
+TAG_PATTERN = re.compile(r"""
+      GTM-(?<![\w-]GTM-)(?P<GTM>[A-Z0-9]{4,9})\b
+    | G-(?<![\w-]G-)(?P<GA4>[A-Z0-9]{8,12})\b
+    | UA-(?<![\w-]UA-)(?P<UA>\d{4,10}-\d{1,4})\b
+    | AW-(?<![\w-]AW-)(?P<AW>\d{6,12})\b
+    | fbq\(\s*['"]init['"]\s*,\s*['"](?P<PIXEL>\d{10,20})['"]
+    | facebook\.com/tr/?\?id=(?P<PIXEL_URL>\d{10,20})
+""", re.VERBOSE)
+
+# Kinds whose full match is the ID itself (prefix included)
+_PREFIXED_KINDS = {'GTM', 'GA4', 'UA', 'AW'}
+
+def tag_from_match(m):
+    """Turn a TAG_PATTERN match into a TagMatch."""
+    kind = m.lastgroup
+    if kind in _PREFIXED_KINDS:
+        return TagMatch(kind, m.group(0))
+    return TagMatch('PIXEL', m.group(kind))
+
+def detect_tags(text):
+    """Return the set of TagMatch found in `text` in a single regex pass."""
+    if not text:
+        return set()
+    return {tag_from_match(m) for m in TAG_PATTERN.finditer(text)}
+
+def gtm_ids(tags):
+    """Sorted GTM container IDs from a collection of TagMatch."""
+    return sorted(t.id for t in tags if t.kind == 'GTM')
+
+def detect_gtm_ids(text):
+    """Shortcut for the GTM IDs in `text`."""
+    return gtm_ids(detect_tags(text))
+
+def gtm_ids_from_urls(urls):
+    """GTM IDs carried by gtm.js?id= URLs (e.g. a redirect chain)."""
+    return sorted({i for u in urls if 'gtm.js' in u for i in detect_gtm_ids(u)})
+
+# -------------------------------------------------------------------
+# Streaming scanner: match tag IDs without buffering the whole body
+# -------------------------------------------------------------------
+SCAN_CHUNK_SIZE = 16 * 1024          # bytes pulled from the socket per read
+SCAN_HEAD_BUDGET = 64 * 1024         # bytes scanned past </head> before stopping early
+SCAN_MAX_BYTES = 5 * 1024 * 1024     # hard cap on bytes read per page
+SCAN_OVERLAP = 128                   # characters carried between chunks
+
+HEAD_END_PATTERN = re.compile(r'</head\s*>', re.IGNORECASE)
+
+def _incremental_decoder(charset):
+    try:
+        return codecs.getincrementaldecoder(charset or 'utf-8')(errors='replace')
+    except LookupError:
+        return codecs.getincrementaldecoder('utf-8')(errors='replace')
+
+async def scan_stream(chunks, charset=None, head_budget=SCAN_HEAD_BUDGET,
+                      max_bytes=SCAN_MAX_BYTES, overlap=SCAN_OVERLAP, hasher=None,
+                      keep_text=0):
+    """
+    Run detect_tags over an async iterator of byte chunks. Matches that
+    straddle chunk boundaries are found by carrying the last `overlap`
+    characters forward.
+
+    Reading stops once a GTM ID is found and `head_budget` bytes past </head>
+    have been scanned, or after `max_bytes`. Returns (tags, stats) where stats
+    holds bytes_read, peak_buffer (largest text window held, in bytes, kept
+    text included), early_exit and truncated.
+
+    If `hasher` (e.g. hashlib.sha256()) is given it is fed the first
+    `head_budget` bytes, a prefix that is always read in full, so the digest
+    is stable across runs regardless of where reading stops.
+
+    With `keep_text` > 0, up to that many characters of the decoded body are
+    also returned as stats['text'] for callers that need a second look. It is
+    only kept while no GTM ID has been found; after that stats['text'] is ''.
+    """
+    decoder = _incremental_decoder(charset)
+    found = set()
+    stats = {'bytes_read': 0, 'peak_buffer': 0, 'early_exit': False, 'truncated': False}
+    tail = ''
+    head_end_at = None
+    kept = []
+    kept_chars = 0
+
+    def decode(chunk, final=False):
+        nonlocal kept_chars
+        text = decoder.decode(chunk, final)
+        if kept_chars < keep_text and text and not has_gtm():
+            kept.append(text[:keep_text - kept_chars])
+            kept_chars += len(kept[-1])
+        return text
+
+    def finish():
+        if keep_text:
+            stats['text'] = ''.join(kept)
+        return found, stats
+
+    def has_gtm():
+        return any(t.kind == 'GTM' for t in found)
+
+    def collect(buffer, final):
+        nonlocal kept_chars
+        for m in TAG_PATTERN.finditer(buffer):
+            # A match touching the end of the window may still be growing
+            if not final and m.end() == len(buffer):
+                continue
+            found.add(tag_from_match(m))
+        if kept and has_gtm():
+            # A GTM ID settles the page: nobody needs a second look
+            kept.clear()
+            kept_chars = keep_text
+
+    async for chunk in chunks:
+        if hasher is not None and stats['bytes_read'] < head_budget:
+            hasher.update(chunk[:head_budget - stats['bytes_read']])
+        stats['bytes_read'] += len(chunk)
+        buffer = tail + decode(chunk)
+        held = len(buffer.encode('utf-8')) + sum(len(k) for k in kept)
+        stats['peak_buffer'] = max(stats['peak_buffer'], held)
+        collect(buffer, final=False)
+
+        if head_end_at is None and HEAD_END_PATTERN.search(buffer):
+            head_end_at = stats['bytes_read']
+        if (head_end_at is not None and has_gtm()
+                and stats['bytes_read'] - head_end_at >= head_budget):
+            stats['early_exit'] = True
+            return finish()
+        if stats['bytes_read'] >= max_bytes:
+            stats['truncated'] = True
+            collect(buffer + decode(b'', final=True), final=True)
+            return finish()
+
+        tail = buffer[-overlap:]
+
+    collect(tail + decode(b'', final=True), final=True)
+    return finish()
+
+async def scan_response(resp, **kwargs):
+    """Stream an aiohttp response body through scan_stream."""
+    return await scan_stream(resp.content.iter_chunked(SCAN_CHUNK_SIZE),
+                             charset=resp.charset, **kwargs)
+
+class ScanTotals:
+    """
+    Running totals of scan_stream's per-page stats: pages, bytes, early
+    exits, truncations and the largest peak buffer with its URL. Nothing
+    is kept per URL, so memory stays flat however many pages a run scans.
+    """
+
+    def __init__(self):
+        self.pages = 0
+        self.bytes_read = 0
+        self.early_exits = 0
+        self.truncated = 0
+        self.peak_buffer = 0
+        self.peak_url = None
+
+    def add(self, url, stats):
+        """Fold one page's scan stats in; returns `stats` for the caller."""
+        self.pages += 1
+        self.bytes_read += stats['bytes_read']
+        self.early_exits += stats['early_exit']
+        self.truncated += stats['truncated']
+        if self.peak_url is None or stats['peak_buffer'] > self.peak_buffer:
+            self.peak_buffer = stats['peak_buffer']
+            self.peak_url = url
+        return stats
+
+    def summary(self):
+        """One-line summary: transfer, peak buffer, early exits."""
+        if not self.pages:
+            return "Scanned 0 pages"
+        return (f"Scanned {self.pages} pages: {self.bytes_read / 1024:.0f} KB transferred "
+                f"({self.bytes_read / self.pages / 1024:.1f} KB avg), "
+                f"peak buffer {self.peak_buffer / 1024:.1f} KB ({self.peak_url}), "
+                f"{self.early_exits} early exits, {self.truncated} truncated")
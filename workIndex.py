@@ -0,0 +1,84 @@
+import asyncio
+from urllib.parse import urlsplit, urlunsplit
+
+# NOTE: shared by GroCSVReader.py and DynamicReader.py; standard library only
+
+# -------------------------------------------------------------------
+# Run-wide URL work index: each page fetched once, shared by every row
+# -------------------------------------------------------------------
+DEFAULT_PORTS = {'http': 80, 'https': 443}
+
+def canonical_url(url):
+    """
+    Key for "the same page": scheme and host lowercased, default port,
+    trailing slash, trailing dot and fragment dropped.
+    """
+    url = url.strip()
+    if '://' not in url:
+        url = 'https://' + url
+    parts = urlsplit(url)
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or '').rstrip('.')
+    try:
+        port = parts.port
+    except ValueError:
+        port = None
+    netloc = host if port in (None, DEFAULT_PORTS.get(scheme)) else f"{host}:{port}"
+    return urlunsplit((scheme, netloc, parts.path.rstrip('/'), parts.query, ''))
+
+class WorkIndex:
+    """
+    Maps canonical URLs to their GTM IDs for the whole run. The first row
+    to ask for a URL runs `fetch(url)`; rows asking while it is in flight
+    await the same task, and later rows get the stored result, so rows
+    sharing a base domain or overlapping subdomains cost one fetch per page.
+    A fetch whose every waiting row has been cancelled (a priority row that
+    is confident or out of time) is cancelled too, and nothing is stored.
+    """
+
+    def __init__(self):
+        self._inflight = {}
+        self._waiters = {}
+        self._done = {}
+        self.stats = {'requests': 0, 'fetches': 0, 'saved': 0}
+
+    async def get(self, url, fetch):
+        """GTM IDs for `url`, running `fetch(url)` only if no row has asked for it yet."""
+        key = canonical_url(url)
+        self.stats['requests'] += 1
+        if key in self._done:
+            self.stats['saved'] += 1
+            return list(self._done[key])
+        task = self._inflight.get(key)
+        if task is None:
+            self.stats['fetches'] += 1
+            task = self._inflight[key] = asyncio.ensure_future(self._run(key, url, fetch))
+        else:
+            self.stats['saved'] += 1
+        self._waiters[task] = self._waiters.get(task, 0) + 1
+        try:
+            return list(await asyncio.shield(task))
+        finally:
+            self._waiters[task] -= 1
+            if not self._waiters[task]:
+                del self._waiters[task]
+                if not task.done():
+                    # Last waiter gone: stop the fetch and let a later row start afresh
+                    if self._inflight.get(key) is task:
+                        del self._inflight[key]
+                    task.cancel()
+                    await asyncio.gather(task, return_exceptions=True)
+
+    async def _run(self, key, url, fetch):
+        try:
+            ids = tuple(await fetch(url))
+        finally:
+            if self._inflight.get(key) is asyncio.current_task():
+                del self._inflight[key]
+        self._done[key] = ids
+        return ids
+
+    def summary(self):
+        s = self.stats
+        return (f"Work index: {s['requests']} URL requests, {s['fetches']} fetched, "
+                f"{s['saved']} answered from the index (fetches saved)")
@@ -0,0 +1,78 @@
+import sys
+
+# NOTE: shared by GroCSVReader.py and DynamicReader.py; standard library only
+
+# -------------------------------------------------------------------
+# Compact per-row records: work items going in, journaled results coming out
+# -------------------------------------------------------------------
+def normalize_subdomains(subdomains):
+    """
+    Sheet subdomains as a de-duplicated tuple of interned `https://` URLs,
+    in their original order; blanks are dropped.
+    """
+    out = {}
+    for sub in subdomains:
+        sub = sub.strip()
+        if sub:
+            out[sys.intern(sub if sub.startswith('https://') else f"https://{sub}")] = None
+    return tuple(out)
+
+def merge_subdomains(normalized, discovered):
+    """
+    Already-normalized subdomains plus discovered `https://` URLs (from
+    filter_subdomains) as one de-duplicated tuple, without re-normalizing.
+    """
+    return tuple(dict.fromkeys(normalized + tuple(sys.intern(u) for u in discovered)))
+
+class WorkItem:
+    """
+    One sheet row on its way through discovery, DNS and scanning. Domains
+    and subdomain URLs are interned (rows of one organization share them)
+    and the sheet's subdomains are normalized once, here. The DNS stage
+    leaves the hosts worth scanning in `scan_subdomains` (None until then)
+    and the journaled `found_subdomains` untouched.
+    """
+    __slots__ = ('row', 'organization', 'website', 'base_domain', 'subdomains', 'gtm_ids',
+                 'found_subdomains', 'scan_subdomains', 'discovered_gtm_ids', 'base_resolves')
+
+    def __init__(self, row, organization, website, base_domain, subdomains=(), gtm_ids=()):
+        self.row = row
+        self.organization = organization
+        self.website = website
+        self.base_domain = sys.intern(base_domain)
+        self.subdomains = normalize_subdomains(subdomains)
+        self.gtm_ids = tuple(gtm_ids)
+        self.found_subdomains = ()
+        self.scan_subdomains = None
+        self.discovered_gtm_ids = ()
+        self.base_resolves = True
+
+    def subdomains_to_scan(self):
+        """The DNS stage's surviving subdomains, or all found ones if it hasn't run."""
+        return self.found_subdomains if self.scan_subdomains is None else self.scan_subdomains
+
+    def record(self, fields):
+        """The journal line's `fields` for this row (tuples as lists)."""
+        return {f: list(v) if isinstance(v, tuple) else v
+                for f, v in ((f, getattr(self, f)) for f in fields)}
+
+class RowResult:
+    """
+    A finished row as replayed from the checkpoint journal, for the resume
+    filter and the write-back. Fields a reader doesn't journal stay empty.
+    """
+    __slots__ = ('website', 'organization', 'gtm_ids', 'subdomains',
+                 'found_subdomains', 'discovered_gtm_ids')
+
+    def __init__(self, website, organization='', gtm_ids=(), subdomains=(),
+                 found_subdomains=(), discovered_gtm_ids=()):
+        self.website = website
+        self.organization = organization
+        self.gtm_ids = tuple(gtm_ids)
+        self.subdomains = tuple(sys.intern(s) for s in subdomains)
+        self.found_subdomains = tuple(sys.intern(s) for s in found_subdomains)
+        self.discovered_gtm_ids = tuple(sys.intern(i) for i in discovered_gtm_ids)
+
+    @classmethod
+    def from_record(cls, record):
+        return cls(**{f: record[f] for f in cls.__slots__ if f in record})